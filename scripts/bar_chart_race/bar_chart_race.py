@@ -0,0 +1,138 @@
+# This script reads data from manualy corrected .csv file (data.csv) from The World Bank,
+# containing population data from all countries.
+# Then it generates an animated "bar chart race": each frame shows the current top N countries of all
+# countries in the file, bars move up and down when ranks change.
+# Top N of every year is found with a partial selection (argpartition) over the whole year column
+# instead of sorting all rows, and rank transitions between consecutive years are precomputed as
+# arrays, so animationFunction only moves the bars.
+import os
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.population_dataset import PopulationDataset
+
+
+class BarChartRaceGenerator:
+    def __init__(self, file_name, output_file_name, top_n=10, steps_per_year=4, figure_color='white',
+            color_map='tab20', render_options=None):
+        self.file_name = file_name
+        self.output_file_name = output_file_name
+        self.top_n = top_n
+        self.steps_per_year = steps_per_year # frames between two consecutive years
+        self.figure_color = figure_color
+        self.color_map = color_map
+        self.render_options = render_options
+        self.dataset = None
+        self.entities = None # rows of the dataset that are in top N in at least one year
+        self.positions = None # array frames x entities, rank (0 - top) of each bar, top_n+ means hidden
+        self.widths = None # array frames x entities, population sizes in mln
+        self.frame_years = None # year label of each frame
+        self.visible_before = None # bars visible in the previous frame
+
+        self.ax = None
+        self.bars = []
+        self.bar_text_list = []
+        self.year_count = None
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.preparePlotData()
+        self.generatePlots()
+
+    def readCsv(self):
+        self.dataset = PopulationDataset(self.file_name)
+
+    def topIndexes(self):
+        # Returns array top_n x years with rows of the dataset ordered by population in every year.
+        # argpartition selects top N of each column in linear time, only those N values are sorted.
+        values = np.where(self.dataset.mask, self.dataset.values, -1).astype(np.float64)
+        top_n = min(self.top_n, values.shape[0])
+        if top_n < values.shape[0]:
+            top = np.argpartition(-values, top_n-1, axis=0)[:top_n]
+        else:
+            top = np.tile(np.arange(values.shape[0])[:, None], (1, values.shape[1]))
+        order = np.argsort(-np.take_along_axis(values, top, axis=0), axis=0, kind='stable')
+        top = np.take_along_axis(top, order, axis=0)
+        # years where fewer than top_n countries have data get -1 at the missing places
+        known = np.take_along_axis(self.dataset.mask, top, axis=0)
+        return np.where(known, top, -1)
+
+    def preparePlotData(self):
+        top = self.topIndexes()
+        years = top.shape[1]
+        self.entities = np.unique(top[top >= 0])
+        if not len(self.entities): # no years or no known population sizes
+            raise ValueError(f'{self.file_name} has no known population sizes, there is nothing to rank')
+        # ranks: entities x years, entities outside of top N are placed just below the chart
+        entity_positions = np.searchsorted(self.entities, np.where(top >= 0, top, self.entities[0]))
+        ranks = np.full((len(self.entities), years), float(self.top_n))
+        rank_numbers = np.broadcast_to(np.arange(top.shape[0])[:, None], top.shape)
+        year_numbers = np.broadcast_to(np.arange(years)[None, :], top.shape)
+        known = top >= 0
+        ranks[entity_positions[known], year_numbers[known]] = rank_numbers[known]
+        populations = np.where(self.dataset.mask[self.entities], self.dataset.values[self.entities], 0)/1000000
+
+        # transitions between consecutive years, eased so bars slow down close to their new place
+        steps = np.arange(self.steps_per_year)/self.steps_per_year
+        steps = steps*steps*(3 - 2*steps)
+        start_ranks, end_ranks = ranks[:, :-1].T, ranks[:, 1:].T
+        start_widths, end_widths = populations[:, :-1].T, populations[:, 1:].T
+        self.positions = (start_ranks[:, None, :]*(1 - steps[None, :, None]) + end_ranks[:, None, :]*steps[None, :, None])
+        self.positions = np.concatenate([self.positions.reshape(-1, len(self.entities)), ranks[:, -1][None, :]])
+        self.widths = (start_widths[:, None, :]*(1 - steps[None, :, None]) + end_widths[:, None, :]*steps[None, :, None])
+        self.widths = np.concatenate([self.widths.reshape(-1, len(self.entities)), populations[:, -1][None, :]])
+        labels = self.dataset.years.labels()
+        self.frame_years = np.repeat(labels[:-1], self.steps_per_year).tolist() + labels[-1:]
+
+    def generatePlots(self):
+        fig, ax = plt.subplots(figsize=(13,7))
+        fig.set_facecolor(self.figure_color)
+        self.ax = ax
+        ax.set_ylim([self.top_n - 0.4, -0.6])
+        ax.set_yticks([])
+        ax.set_xlabel('Population size [mln]', size=12, fontweight='bold')
+        ax.set_title(f'Top {self.top_n} countries by population', size=20, fontweight='bold')
+        ax.grid(zorder=1, axis='x', color='#d4d4d4')
+
+        colors = plt.get_cmap(self.color_map)
+        codes = self.dataset.codes[self.entities]
+        for index in range(len(self.entities)):
+            self.bars.append(ax.barh(self.positions[0, index], self.widths[0, index], height=0.8,
+                color=colors(self.entities[index] % colors.N), zorder=10)[0])
+            self.bar_text_list.append(ax.text(self.widths[0, index], self.positions[0, index], f' {codes[index]}',
+                size=10, verticalalignment='center', zorder=11))
+        self.year_count = ax.text(0.97, 0.07, self.frame_years[0], transform=ax.transAxes, horizontalalignment='right',
+           verticalalignment='bottom', size='20', backgroundcolor='white', zorder=12,
+           bbox={'facecolor': 'white', 'pad': 5,'edgecolor': '#d4d4d4'})
+        self.visible_before = np.ones(len(self.entities), dtype=bool)
+        self.animationFunction(0)
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.frame_years)), self.output_file_name,
+            self.render_options, interval=150//self.steps_per_year)
+
+    def animationFunction(self, frame):
+        positions, widths = self.positions[frame], self.widths[frame]
+        visible = positions < self.top_n
+        self.year_count.set_text(self.frame_years[frame])
+        self.ax.set_xlim([0, widths[visible].max()*1.15 if visible.any() else 1])
+        # only bars shown in this or in the previous frame need updates
+        for index in np.flatnonzero(visible | self.visible_before):
+            bar = self.bars[index]
+            bar.set_visible(visible[index])
+            self.bar_text_list[index].set_visible(visible[index])
+            if not visible[index]: continue
+            bar.set_y(positions[index] - 0.4)
+            bar.set_width(widths[index])
+            self.bar_text_list[index].set_position((widths[index], positions[index]))
+        self.visible_before = visible
+
+
+if __name__=="__main__":
+    BarChartRaceGenerator(
+        file_name='data.csv',
+        output_file_name='bar_chart_race.gif',
+        top_n=10,
+        steps_per_year=4,
+        figure_color='#ded6bd'
+    )
@@ -0,0 +1,230 @@
+# Benchmark suite for the plot generators.
+# It measures every stage of the generators: readCsv, extractDataFromYear, randomYear/getRandomYear,
+# preparePlotData, a single animationFunction step of the bar, line, bubble and pie charts,
+# a full saveAnimation of the bar chart (default GIF writer and DeltaGifWriter) and the Gantt chart build.
+# Each stage is timed several times with a fixed random seed (min/median/mean are reported) and run once
+# more under tracemalloc to get its peak Python allocations. Stages run on the bundled data/ files
+# and on synthetic inputs (synthetic_data_generator.py) scaled up by the given factors, results are
+# written as JSON.
+# Usage: python benchmark_generators.py --scales 1 10 100 --repeats 5 --output results.json
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'data')
+CHOSEN_COUNTRIES = ['China', 'India', 'United States', 'Indonesia', 'Pakistan']
+COLORS = ['#b80614', '#f5d922', '#002868', '#a504c9', '#065c29']
+sys.path.append(SCRIPTS_DIR)
+from common import animation_output
+
+
+def loadScript(relative_path):
+    # Imports a generator script by its path (scripts share file names like a.py, so they can't be
+    # imported as regular modules)
+    module_name = 'benchmark_' + relative_path.replace('/', '_').replace('.py', '')
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class CapturedAnimation:
+    # Stands in for saveAnimation of the generator's module while a generator is built, so generatePlots
+    # only prepares the figure. The figure, update function and frames are kept for the benchmarks.
+    last = None
+
+    def __init__(self, fig, animation_function, frames, output_file_name, render_options=None, **kwargs):
+        self.fig = fig
+        self.func = animation_function
+        self.frames = list(frames)
+        self.kwargs = kwargs
+        CapturedAnimation.last = self
+
+
+def buildGenerator(module, class_name, overrides=None, **kwargs):
+    # Creates generator with captured animation. overrides - methods replaced in a subclass
+    # (used to make random country choice fixed)
+    cls = getattr(module, class_name)
+    if overrides: cls = type(class_name + 'Benchmark', (cls,), overrides)
+    module.saveAnimation = CapturedAnimation
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = cls(**kwargs)
+    finally:
+        module.saveAnimation = animation_output.saveAnimation
+    return generator, CapturedAnimation.last
+
+
+class GeneratorBenchmark:
+    def __init__(self, scales, repeats, save_repeats, seed, work_dir):
+        self.scales = scales
+        self.repeats = repeats
+        self.save_repeats = save_repeats
+        self.seed = seed
+        self.work_dir = work_dir
+        self.results = []
+        self.modules = {
+            'bar': loadScript('lab_2_task_1/colored/a.py'),
+            'line': loadScript('lab_2_task_2/a.py'),
+            'bubble': loadScript('lab_2_task_2/b.py'),
+            'pie': loadScript('lab_2_task_2/c.py'),
+        }
+        self.synthetic_module = loadScript('synthetic_data/synthetic_data_generator.py')
+
+    def measure(self, stage, scale, rows, function, setup=None, repeats=None):
+        # Times function (setup is run before every call, outside of the timing) and
+        # measures its peak traced allocations in one extra run
+        repeats = repeats or self.repeats
+        timings = []
+        try:
+            for _ in range(repeats):
+                random.seed(self.seed)
+                if setup: setup()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()): function()
+                timings.append(time.perf_counter() - start)
+            random.seed(self.seed)
+            if setup: setup()
+            tracemalloc.start()
+            with contextlib.redirect_stdout(io.StringIO()): function()
+            peak_allocations = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        except Exception as error:
+            if tracemalloc.is_tracing(): tracemalloc.stop()
+            self.results.append({'stage': stage, 'scale': scale, 'rows': rows, 'error': repr(error)})
+            return
+        self.results.append({'stage': stage, 'scale': scale, 'rows': rows, 'repeats': repeats,
+            'min_s': min(timings), 'median_s': statistics.median(timings), 'mean_s': statistics.mean(timings),
+            'peak_alloc_bytes': peak_allocations})
+
+    def prepareInputs(self, scale):
+        # Returns paths of population, country sizes and calendar files for the given scale and countries
+        # to plot. Scaled inputs are synthetic files with 216*scale entities.
+        if scale == 1:
+            return (os.path.join(DATA_DIR, 'country_data.csv'), os.path.join(DATA_DIR, 'country_sizes.csv'),
+                os.path.join(DATA_DIR, 'calendar_year_table.csv'), CHOSEN_COUNTRIES)
+        output_path = os.path.join(self.work_dir, f'synthetic_x{scale}')
+        generator = self.synthetic_module.SyntheticDataGenerator(output_path, entities=216*scale,
+            calendar_rows=34*scale, seed=self.seed)
+        population_file, sizes_file, calendar_file = generator.generate()
+        return population_file, sizes_file, calendar_file, [generator.countryName(i) for i in range(5)]
+
+    def runScale(self, scale):
+        population_file, sizes_file, calendar_file, chosen_countries = self.prepareInputs(scale)
+        gif_file = os.path.join(self.work_dir, f'benchmark_x{scale}.gif')
+        bar, bar_animation = buildGenerator(self.modules['bar'], 'PopulationPlotsGenerator',
+            file_name=population_file, chosen_countries=chosen_countries, x_title='', bar_colors=COLORS,
+            output_file_name=gif_file)
+        rows = len(bar.countries)
+        middle_year = bar.years[len(bar.years)//2]
+
+        def resetCountries():
+            bar.countries, bar.country_codes, bar.years = {}, {}, []
+        self.measure('readCsv', scale, rows, bar.readCsv, setup=resetCountries)
+        self.measure('extractDataFromYear', scale, rows, lambda: bar.extractDataFromYear(middle_year))
+
+        def resetPlotData():
+            bar.plot_data, bar.max_population = {}, 0
+        self.measure('preparePlotData', scale, rows, bar.preparePlotData, setup=resetPlotData)
+
+        def fixedYear(generator):
+            generator.chosen_countries = chosen_countries
+            generator.subtitle = ''
+        pie_module = self.modules['pie']
+        pie, pie_animation = buildGenerator(pie_module, 'PopulationPlotsGenerator_RandomChoice_PolandCentered',
+            overrides={'getRandomYear': fixedYear}, file_name=population_file, pie_colors=COLORS,
+            output_file_name=gif_file)
+
+        def randomYear():
+            try: pie.randomYear()
+            except TypeError: pass # drawn year with missing data, getRandomYear draws again
+        self.measure('randomYear', scale, rows, randomYear)
+        getRandomYear = pie_module.PopulationPlotsGenerator_RandomChoice_PolandCentered.getRandomYear
+        self.measure('getRandomYear', scale, rows, lambda: getRandomYear(pie))
+
+        line, line_animation = buildGenerator(self.modules['line'], 'PopulationPlotsGenerator',
+            file_name=population_file, chosen_countries=chosen_countries, x_title='', line_colors=COLORS,
+            output_file_name=gif_file)
+        bubble, bubble_animation = buildGenerator(self.modules['bubble'], 'PopulationPlotsGenerator_RandomChoice',
+            overrides={'getRandomCountryAndYear': fixedYear}, population_file_name=population_file,
+            country_sizes_file_name=sizes_file, bubble_colors=COLORS, output_file_name=gif_file)
+        for chart, captured in (('bar', bar_animation), ('line', line_animation), ('bubble', bubble_animation),
+                ('pie', pie_animation)):
+            frames = iter(captured.frames*(self.repeats+1))
+            self.measure(f'animationFunction[{chart}]', scale, rows, lambda: captured.func(next(frames)))
+            self.measure(f'animationFunction+draw[{chart}]', scale, rows,
+                lambda: (captured.func(next(frames)), captured.fig.canvas.draw()))
+            plt.close(captured.fig)
+
+        def saveAnimation(render_options=None):
+            generator, captured = buildGenerator(self.modules['bar'], 'PopulationPlotsGenerator',
+                file_name=population_file, chosen_countries=chosen_countries, x_title='', bar_colors=COLORS,
+                output_file_name=gif_file)
+            animation_output.saveAnimation(captured.fig, captured.func, captured.frames, gif_file, render_options,
+                **captured.kwargs)
+            plt.close(captured.fig)
+        self.measure('saveAnimation[bar]', scale, rows, saveAnimation, repeats=self.save_repeats)
+        self.measure('saveAnimation[bar, delta_frames]', scale, rows,
+            lambda: saveAnimation(animation_output.RenderOptions(delta_frames=True)), repeats=self.save_repeats)
+
+        def buildGantt():
+            # Gantt script reads table.csv from the working directory and writes its outputs there
+            gantt_dir = os.path.join(self.work_dir, f'gantt_x{scale}')
+            os.makedirs(gantt_dir, exist_ok=True)
+            shutil.copyfile(calendar_file, os.path.join(gantt_dir, 'table.csv'))
+            working_dir = os.getcwd()
+            os.chdir(gantt_dir)
+            try: runpy.run_path(os.path.join(SCRIPTS_DIR, 'lab_3_task_4', 'gannt_plot_colored.py'))
+            finally:
+                os.chdir(working_dir)
+                plt.close('all')
+        self.measure('gantt build', scale, rows, buildGantt, repeats=self.save_repeats)
+
+    def run(self):
+        for scale in self.scales: self.runScale(scale)
+        return {
+            'metadata': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'matplotlib': matplotlib.__version__,
+                'repeats': self.repeats,
+                'save_repeats': self.save_repeats,
+                'seed': self.seed,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'results': self.results,
+        }
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks every stage of the plot generators.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+        help='input size multipliers (216*scale synthetic entities), 1 means the bundled data/ files')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--save-repeats', type=int, default=1, help='repeats of saveAnimation and Gantt build')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file, printed to stdout if not given')
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = GeneratorBenchmark(arguments.scales, arguments.repeats, arguments.save_repeats,
+            arguments.seed, work_dir).run()
+    if arguments.output:
+        with open(arguments.output, 'w') as file: json.dump(results, file, indent=2)
+    else: print(json.dumps(results, indent=2))
@@ -0,0 +1,2 @@
+# Helpers shared by the plot generators (output stages, data loading, instrumentation).
+# Scripts add the "scripts" directory to sys.path and import them as common.<module>.
@@ -0,0 +1,226 @@
+# Output stage shared by the animated generators. Instead of calling FuncAnimation(...).save() directly,
+# generators call saveAnimation() with their figure, update function and frames.
+# Without render options it behaves like before.
+# RenderOptions can carry instruments - objects notified when each rendering stage of each frame starts and ends:
+#   parse     - reading input files (reported by the generators)
+#   prepare   - choosing countries and preparing plot data (reported by the generators)
+#   init      - the first animationFunction call, like FuncAnimation's initial draw
+#   update    - generator's animationFunction (data lookup and artist updates)
+#   draw      - Agg draw of the whole figure
+#   rasterize - copying Agg buffer into an image
+#   encode    - converting the frame to the GIF palette
+#   write     - writing the finished file (once, after the last frame)
+# RenderOptions can also make a preview of the animation through the same code path: lower dpi,
+# smaller figure, every Nth frame, or only the first and the last frame on one image (contact sheet):
+#   render_options=RenderOptions.preview(frame_stride=5, dpi=50)
+# default_render_options is used by generators created without render options (see preview_generator.py).
+# With RenderOptions(delta_frames=True) GIF files are written by DeltaGifWriter (see delta_gif.py):
+# every frame holds only the region which changed since the previous frame, in one global palette.
+# It is opt-in, without it GIF files are written with full frames as before.
+# Generators may pass animated_artists - the only artists their update function changes. GIF writers
+# then draw the rest of the figure once and every frame only those artists over it (blitting).
+import os
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image
+from matplotlib.animation import FuncAnimation, PillowWriter
+from common.delta_gif import DeltaGifEncoder
+
+
+class RenderInstrument:
+    # Base class of objects observing rendering, subclasses override methods they need
+    def startRender(self, output_file_name, writer): pass
+    def startStage(self, stage, frame): pass
+    def endStage(self, stage, frame): pass
+    def endRender(self, writer): pass
+
+
+class RenderOptions:
+    def __init__(self, instruments=None, dpi=None, scale=1.0, frame_stride=1, contact_sheet=False, delta_frames=False):
+        self.instruments = instruments or []
+        self.dpi = dpi # dpi of the frames, the figure's dpi if None
+        self.scale = scale # figure size multiplier
+        self.frame_stride = frame_stride # every Nth frame is rendered (the last one always)
+        self.contact_sheet = contact_sheet # only the first and the last frame, side by side in one .png file
+        self.delta_frames = delta_frames # GIF frames hold only the changed region (DeltaGifWriter)
+
+    @classmethod
+    def preview(cls, frame_stride=5, dpi=50, scale=1.0, contact_sheet=False, instruments=None, delta_frames=False):
+        return cls(instruments, dpi, scale, frame_stride, contact_sheet, delta_frames)
+
+    def isPreview(self):
+        return self.dpi is not None or self.scale != 1.0 or self.frame_stride != 1 or self.contact_sheet
+
+    def selectFrames(self, frames):
+        # contact sheet takes all frames, only two of them are drawn
+        frames = list(frames)
+        if self.contact_sheet: return frames
+        selected = frames[::self.frame_stride]
+        if frames and (len(frames) - 1) % self.frame_stride: selected.append(frames[-1])
+        return selected
+
+
+default_render_options = None # used by saveAnimation when a generator has no render options
+
+
+@contextmanager
+def renderStage(render_options, stage, frame=None):
+    # Notifies instruments about one stage, does nothing without render options
+    render_options = render_options or default_render_options
+    instruments = render_options.instruments if render_options else []
+    for instrument in instruments: instrument.startStage(stage, frame)
+    try: yield
+    finally:
+        # every instrument ends the stage, an error of one of them (like MemoryError of a memory limit)
+        # is raised after all of them
+        error = None
+        for instrument in reversed(instruments):
+            try: instrument.endStage(stage, frame)
+            except Exception as instrument_error: error = error or instrument_error
+        if error is not None: raise error
+
+
+class StagedGifWriter(PillowWriter):
+    # PillowWriter with grab_frame split into draw, rasterize and encode stages.
+    # Frames are converted to palette images here (Pillow would do the same conversion while saving),
+    # so encoding cost is attributed to the frame that caused it.
+    def __init__(self, render_options, **kwargs):
+        super().__init__(**kwargs)
+        self.render_options = render_options
+        self.frame_index = 0
+        self.animated_artists = [] # drawn every frame over the background, the whole figure is drawn if empty
+        self.background = None
+
+    def setup(self, fig, outfile, dpi=None):
+        super().setup(fig, outfile, dpi)
+        self.original_dpi = fig.dpi
+        fig.set_dpi(self.dpi)
+
+    def grab_frame(self, **savefig_kwargs):
+        with renderStage(self.render_options, 'draw', self.frame_index):
+            if self.animated_artists: self.blitFrame()
+            else: self.fig.canvas.draw()
+        with renderStage(self.render_options, 'rasterize', self.frame_index):
+            image = Image.fromarray(np.asarray(self.fig.canvas.buffer_rgba()).copy())
+        with renderStage(self.render_options, 'encode', self.frame_index):
+            self.encodeFrame(image)
+        self.frame_index += 1
+
+    def blitFrame(self):
+        # the figure without animated artists is drawn once, then only the animated artists over its copy
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw()
+            self.background = canvas.copy_from_bbox(self.fig.bbox)
+        else:
+            canvas.restore_region(self.background)
+        for artist in self.animated_artists: self.fig.draw_artist(artist)
+
+    def encodeFrame(self, image):
+        self._frames.append(image.convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE))
+
+    def finish(self):
+        with renderStage(self.render_options, 'write'):
+            super().finish()
+        self.fig.set_dpi(self.original_dpi)
+
+
+class DeltaGifWriter(StagedGifWriter):
+    # Frames are cropped to the changed region and converted to the global palette as they come,
+    # the file is written frame by frame instead of keeping all frames until the end.
+    def setup(self, fig, outfile, dpi=None):
+        super().setup(fig, outfile, dpi)
+        self.encoder = DeltaGifEncoder(outfile, duration=int(1000/self.fps))
+
+    def encodeFrame(self, image):
+        self.encoder.addFrame(image)
+
+    def finish(self):
+        with renderStage(self.render_options, 'write'):
+            self.encoder.close()
+        self.fig.set_dpi(self.original_dpi)
+
+
+class ContactSheetWriter(StagedGifWriter):
+    # Draws only the first and the last frame and writes them side by side to one image.
+    # The update function still runs for every frame, so charts which accumulate data
+    # (lines growing year by year) show the same last frame as the full animation.
+    def __init__(self, render_options, frame_count, **kwargs):
+        super().__init__(render_options, **kwargs)
+        self.frame_count = frame_count
+
+    def grab_frame(self, **savefig_kwargs):
+        if self.frame_index in (0, self.frame_count - 1): super().grab_frame(**savefig_kwargs)
+        else: self.frame_index += 1
+
+    def finish(self):
+        with renderStage(self.render_options, 'write'):
+            frames = [i.convert('RGB') for i in self._frames]
+            sheet = Image.new('RGB', (sum(i.width for i in frames), max(i.height for i in frames)), 'white')
+            for index, frame in enumerate(frames):
+                sheet.paste(frame, (sum(i.width for i in frames[:index]), 0))
+            sheet.save(self.outfile)
+        self.fig.set_dpi(self.original_dpi)
+
+
+def contactSheetName(output_file_name):
+    return os.path.splitext(output_file_name)[0] + '_contact_sheet.png'
+
+
+def instrumentedUpdate(animation_function, render_options):
+    # Wraps generator's animationFunction so that every call is reported as the update stage.
+    # The first call is the initial draw (no frame is grabbed after it), so it is reported as the init stage.
+    frame_index = [-1]
+    def update(frame):
+        stage = 'init' if frame_index[0] < 0 else 'update'
+        with renderStage(render_options, stage, max(frame_index[0], 0)):
+            result = animation_function(frame)
+        frame_index[0] += 1
+        return result
+    return update
+
+
+def saveAnimation(fig, animation_function, frames, output_file_name, render_options=None, interval=150,
+        animated_artists=None):
+    # Saves the animation to output_file_name, with FuncAnimation or the frame loop of writeFrames
+    render_options = render_options or default_render_options or RenderOptions()
+    animated_artists = animated_artists or []
+    is_gif = output_file_name.lower().endswith('.gif')
+    if not (render_options.instruments or render_options.isPreview() or (is_gif and render_options.delta_frames)):
+        for artist in animated_artists: artist.set_animated(False) # matplotlib's writers draw whole figures
+        animation = FuncAnimation(fig, func=animation_function, frames=frames, interval=interval, repeat=True,
+            blit=False)
+        animation.save(output_file_name)
+        return
+
+    frames = render_options.selectFrames(frames)
+    writer = None # other formats use matplotlib's default writer, only the update stage is reported
+    if render_options.contact_sheet:
+        output_file_name = contactSheetName(output_file_name)
+        writer = ContactSheetWriter(render_options, len(frames), fps=1000/interval)
+    elif is_gif:
+        writer = (DeltaGifWriter if render_options.delta_frames else StagedGifWriter)(render_options, fps=1000/interval)
+    for artist in animated_artists: artist.set_animated(writer is not None)
+    if writer is not None: writer.animated_artists = animated_artists
+    size = fig.get_size_inches()
+    fig.set_size_inches(size*render_options.scale)
+    for instrument in render_options.instruments: instrument.startRender(output_file_name, writer)
+    update = instrumentedUpdate(animation_function, render_options)
+    try:
+        if writer is None:
+            FuncAnimation(fig, func=update, frames=frames, interval=interval, repeat=True,
+                blit=False).save(output_file_name, dpi=render_options.dpi)
+        else: writeFrames(fig, update, frames, writer, output_file_name, render_options.dpi)
+    finally: fig.set_size_inches(size)
+    for instrument in render_options.instruments: instrument.endRender(writer)
+
+
+def writeFrames(fig, update, frames, writer, output_file_name, dpi=None):
+    # Frame loop of FuncAnimation.save for the writers above: the initial call with the first frame,
+    # then update and grab_frame for every frame. The writer draws every frame itself, so the figure
+    # is not drawn again after each update like FuncAnimation does (draw_idle is a full draw on Agg).
+    with writer.saving(fig, output_file_name, dpi or fig.dpi):
+        if len(frames): update(frames[0])
+        for frame in frames:
+            update(frame)
+            writer.grab_frame()
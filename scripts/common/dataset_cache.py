@@ -0,0 +1,171 @@
+# Cache of the parsed population data kept alongside the .csv file in the directory <file>.cache/,
+# so the text is parsed once and later runs load numpy arrays instead:
+#   manifest.json            - size and modification time of the .csv, years, blocks and declared groupings
+#   names.npy, codes.npy
+#   block_<n>_values.npy, block_<n>_mask.npy   - values of a rectangle of rows x columns
+#   ranks_<n>.npy            - ranks of a range of columns (all rows known when it was written)
+#   known_counts.npy, first_known.npy, last_known.npy - validity of the data
+#   grouping_<n>_*.npy       - rows and groups of every grouping and its rollup (totals, complete)
+# The cache is rebuilt when the .csv changes, and a rollup is reused only for the same grouping.
+# appendCsv adds new years or countries as new blocks, so the stored blocks are not written again.
+import json
+import os
+import numpy as np
+from common.parallel_csv import readCsvParallel
+from common.population_dataset import PopulationDataset
+
+VALIDITY = ('known_counts', 'first_known', 'last_known')
+
+
+def cachePath(file_name):
+    return file_name + '.cache'
+
+
+def sourceStamp(file_name):
+    status = os.stat(file_name)
+    return {'size': status.st_size, 'mtime_ns': status.st_mtime_ns}
+
+
+def readManifest(cache_path):
+    manifest_file = os.path.join(cache_path, 'manifest.json')
+    if not os.path.exists(manifest_file): return None
+    with open(manifest_file) as file:
+        return json.load(file)
+
+
+def writeManifest(cache_path, manifest):
+    # written to a temporary file and renamed, so an interrupted run never leaves half of a manifest
+    manifest_file = os.path.join(cache_path, 'manifest.json')
+    with open(manifest_file + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+
+def saveBlock(dataset, cache_path, manifest, rows, columns):
+    # Saves values of the rectangle rows x columns (slices) as a new block
+    block_id = manifest['next_block']
+    manifest['next_block'] += 1
+    prefix = os.path.join(cache_path, f'block_{block_id}_')
+    np.save(prefix + 'values.npy', dataset.values[rows, columns])
+    np.save(prefix + 'mask.npy', dataset.mask[rows, columns])
+    manifest['blocks'].append({'id': block_id, 'rows': [rows.start, rows.stop], 'columns': [columns.start, columns.stop]})
+
+
+def saveRanks(dataset, cache_path, manifest, columns):
+    # Saves ranks of the columns (slice), replacing ranks of the same columns saved before
+    previous = [i for i in manifest['rank_blocks'] if i['columns'] == [columns.start, columns.stop]]
+    entry = previous[0] if previous else {'id': manifest['next_block'], 'columns': [columns.start, columns.stop]}
+    if not previous:
+        manifest['next_block'] += 1
+        manifest['rank_blocks'].append(entry)
+    np.save(os.path.join(cache_path, f"ranks_{entry['id']}.npy"), dataset.ranks[:, columns])
+
+
+def saveValidity(dataset, cache_path):
+    for name in VALIDITY:
+        np.save(os.path.join(cache_path, name + '.npy'), getattr(dataset, name))
+
+
+def saveCache(dataset, cache_path=None):
+    cache_path = cache_path or cachePath(dataset.file_name)
+    os.makedirs(cache_path, exist_ok=True)
+    if dataset.ranks is None: dataset.buildIndexes()
+    np.save(os.path.join(cache_path, 'names.npy'), dataset.names)
+    np.save(os.path.join(cache_path, 'codes.npy'), dataset.codes)
+    manifest = {'source': sourceStamp(dataset.file_name), 'appended': [], 'years': dataset.years.values.tolist(),
+        'blocks': [], 'rank_blocks': [], 'next_block': 0, 'groupings': {}}
+    everything = (slice(0, len(dataset.names)), slice(0, len(dataset.years)))
+    saveBlock(dataset, cache_path, manifest, *everything)
+    saveRanks(dataset, cache_path, manifest, everything[1])
+    saveValidity(dataset, cache_path)
+    writeManifest(cache_path, manifest)
+    dataset.cache_path = cache_path
+    for name in dataset.groupings: saveGrouping(dataset, cache_path, name)
+
+
+def saveGrouping(dataset, cache_path, name):
+    # Saves grouping and its rollup (if already computed) under the next free number of the manifest
+    manifest = readManifest(cache_path)
+    entry = manifest['groupings'].get(name, {'id': len(manifest['groupings'])})
+    entry['groups'] = dataset.groupings[name]['groups']
+    prefix = os.path.join(cache_path, f"grouping_{entry['id']}_")
+    np.save(prefix + 'rows.npy', dataset.groupings[name]['rows'])
+    np.save(prefix + 'group_ids.npy', dataset.groupings[name]['group_ids'])
+    entry['rollup'] = name in dataset.rollups
+    if entry['rollup']:
+        np.save(prefix + 'totals.npy', dataset.rollups[name]['totals'])
+        np.save(prefix + 'complete.npy', dataset.rollups[name]['complete'])
+    manifest['groupings'][name] = entry
+    writeManifest(cache_path, manifest)
+
+
+def loadCache(file_name, cache_path=None):
+    # Dataset from the cache, None if there is no cache or the .csv changed since it was written
+    cache_path = cache_path or cachePath(file_name)
+    manifest = readManifest(cache_path)
+    if manifest is None or manifest['source'] != sourceStamp(file_name) or 'blocks' not in manifest: return None
+    names = np.load(os.path.join(cache_path, 'names.npy'))
+    codes = np.load(os.path.join(cache_path, 'codes.npy'))
+    shape = (len(names), len(manifest['years']))
+    values, mask = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=bool)
+    for block in manifest['blocks']:
+        prefix = os.path.join(cache_path, f"block_{block['id']}_")
+        target = (slice(*block['rows']), slice(*block['columns']))
+        values[target], mask[target] = np.load(prefix + 'values.npy'), np.load(prefix + 'mask.npy')
+    dataset = PopulationDataset.fromArrays(names, codes, manifest['years'], values, mask)
+    dataset.file_name = file_name
+    dataset.ranks = np.full(shape, -1, dtype=np.int64)
+    for block in manifest['rank_blocks']:
+        ranks = np.load(os.path.join(cache_path, f"ranks_{block['id']}.npy"))
+        dataset.ranks[:len(ranks), slice(*block['columns'])] = ranks
+    for name in VALIDITY: setattr(dataset, name, np.load(os.path.join(cache_path, name + '.npy')))
+    for name, entry in manifest['groupings'].items():
+        prefix = os.path.join(cache_path, f"grouping_{entry['id']}_")
+        dataset.groupings[name] = {'groups': entry['groups'], 'rows': np.load(prefix + 'rows.npy'),
+            'group_ids': np.load(prefix + 'group_ids.npy')}
+        if entry['rollup']:
+            dataset.rollups[name] = {'groups': entry['groups'], 'totals': np.load(prefix + 'totals.npy'),
+                'complete': np.load(prefix + 'complete.npy')}
+    dataset.cache_path = cache_path
+    return dataset
+
+
+def loadDataset(file_name, use_cache=True, processes=1):
+    # Loads the dataset from the cache if it is up to date, otherwise parses the .csv and writes the cache.
+    # Groupings declared later with addGrouping are saved to the cache together with their rollups.
+    # processes - number of processes parsing the .csv (see parallel_csv.py), all cores if None
+    dataset = loadCache(file_name) if use_cache else None
+    if dataset is None:
+        dataset = PopulationDataset(file_name) if processes == 1 else readCsvParallel(file_name, processes)
+        if use_cache: saveCache(dataset)
+    return dataset
+
+
+def appendCsv(file_name, appended_file):
+    # Adds new years and/or countries of appended_file (a .csv file in the format of data.csv, e.g. with
+    # one new year) to the cached dataset of file_name. Only the added rows and columns are written:
+    # a block with the new columns, a block with history of the new countries and ranks of the new columns.
+    # Ranks of stored columns are written again only where new countries are known in them.
+    dataset = loadDataset(file_name)
+    row_count, column_count = dataset.values.shape
+    added_rows, added_columns = dataset.appendCsv(appended_file)
+    cache_path = dataset.cache_path
+    manifest = readManifest(cache_path)
+    if added_columns.stop > added_columns.start:
+        saveBlock(dataset, cache_path, manifest, slice(0, added_rows.stop), added_columns)
+        saveRanks(dataset, cache_path, manifest, added_columns)
+    if added_rows.stop > added_rows.start:
+        np.save(os.path.join(cache_path, 'names.npy'), dataset.names)
+        np.save(os.path.join(cache_path, 'codes.npy'), dataset.codes)
+        if column_count: saveBlock(dataset, cache_path, manifest, added_rows, slice(0, column_count))
+        for block in manifest['rank_blocks']:
+            columns = slice(*block['columns'])
+            if columns.start < column_count and dataset.mask[added_rows, columns].any():
+                saveRanks(dataset, cache_path, manifest, columns)
+    saveValidity(dataset, cache_path)
+    manifest['years'] = dataset.years.values.tolist()
+    manifest['appended'].append({'file_name': appended_file, 'source': sourceStamp(appended_file),
+        'rows': [added_rows.start, added_rows.stop], 'columns': [added_columns.start, added_columns.stop]})
+    writeManifest(cache_path, manifest)
+    for name in dataset.rollups: saveGrouping(dataset, cache_path, name)
+    return dataset
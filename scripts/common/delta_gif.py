@@ -0,0 +1,145 @@
+# GIF encoder which writes only the part of every frame that changed since the previous frame.
+# Consecutive frames of the charts differ only in bar tops, labels and the year counter, so every frame
+# after the first one is cropped to the bounding box of changed pixels, and the pixels of the box
+# which did not change are transparent (the previous frame stays visible under them - disposal 1),
+# which leaves long runs of one index for the LZW compression.
+# All frames are converted to one global palette made from the first frame, its most frequent colors
+# are kept exactly. A frame with colors which are not in that palette (e.g. a new color appears later)
+# gets its own local palette.
+# A frame identical to the previous one only extends the display time of the previous one.
+#   encoder = DeltaGifEncoder('chart.gif', duration=150)
+#   for frame in frames: encoder.addFrame(frame) # RGB(A) numpy array or PIL image
+#   encoder.close()
+import struct
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+TRANSPARENT = 255 # index of unchanged pixels in the global palette, palettes have at most 255 colors
+MAX_COLOR_ERROR = 48 # the largest difference of a channel allowed after the conversion to the global palette
+
+
+def packColors(rgb):
+    # colors of an RGB array as single integers 0xRRGGBB
+    return (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+
+
+class Palette:
+    # Palette of at most 255 colors made for an RGB array: its most frequent colors exactly (background,
+    # bars, text), the rest by median cut of the remaining pixels (antialiasing).
+    # Pixels of exactly those colors are converted by lookup, only the rest by Pillow's nearest color
+    # (which works on a reduced color cube, so it could replace even white with a close gray).
+    def __init__(self, rgb, exact_colors=128):
+        packed = packColors(rgb).ravel()
+        colors, counts = np.unique(packed, return_counts=True)
+        if len(colors) > TRANSPARENT:
+            frequent = colors[np.argsort(-counts, kind='stable')[:exact_colors]]
+            rest = packed[~np.isin(packed, frequent)]
+            rest = np.stack([rest >> 16, rest >> 8 & 255, rest & 255], axis=1).astype(np.uint8)[None]
+            rest = Image.fromarray(rest).quantize(TRANSPARENT - exact_colors, dither=Image.Dither.NONE)
+            rest = np.array(rest.getpalette(), dtype=np.uint8).reshape(-1, 3)[:TRANSPARENT - exact_colors]
+            colors = np.concatenate([frequent, packColors(rest)])
+        self.colors = np.stack([colors >> 16, colors >> 8 & 255, colors & 255], axis=1).astype(np.int16)
+        self.image = Image.new('P', (1, 1))
+        self.image.putpalette(self.colors.astype(np.uint8).tobytes())
+        self.order = np.argsort(colors, kind='stable')
+        self.sorted_colors = colors[self.order]
+
+    def convert(self, rgb):
+        # (array of palette indexes, the largest difference of a channel from the original colors)
+        packed = packColors(rgb)
+        positions = np.minimum(np.searchsorted(self.sorted_colors, packed), len(self.sorted_colors) - 1)
+        exact = self.sorted_colors[positions] == packed
+        indexes = self.order[positions].astype(np.uint8)
+        if exact.all(): return indexes, 0
+        # as one row of pixels, rgb may be an area or only a list of colors
+        nearest = Image.fromarray(np.ascontiguousarray(rgb.reshape(1, -1, 3))).quantize(palette=self.image, dither=Image.Dither.NONE)
+        nearest = np.asarray(nearest).reshape(rgb.shape[:-1])
+        indexes = np.where(exact, indexes, nearest)
+        return indexes, np.abs(self.colors[indexes] - rgb).max()
+
+    def tableBytes(self, size=256):
+        # color table of the given size, unused entries are black
+        table = np.zeros((size, 3), dtype=np.uint8)
+        table[:len(self.colors)] = self.colors
+        return table.tobytes()
+
+
+class DeltaGifEncoder:
+    def __init__(self, file_name, duration=100, loop=0):
+        self.file = open(file_name, 'wb')
+        self.duration = duration # display time of a frame in milliseconds
+        self.loop = loop # number of repetitions, 0 - forever
+        self.palette = None # global Palette made from the first frame
+        self.previous = None # RGB array of the previous frame
+        self.pending = None # [image, offset, duration, local palette, transparency], written when the next frame is known
+        self.stats = {'frames': 0, 'skipped': 0, 'local_palettes': 0, 'written_pixels': 0, 'pixels': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def addFrame(self, frame, duration=None):
+        rgb = np.asarray(frame.convert('RGB') if isinstance(frame, Image.Image) else frame)[:, :, :3]
+        duration = duration or self.duration
+        self.stats['frames'] += 1
+        self.stats['pixels'] += rgb.shape[0]*rgb.shape[1]
+        if self.previous is None:
+            changed = None
+            top, bottom, left, right = 0, rgb.shape[0], 0, rgb.shape[1]
+        else:
+            if rgb.shape != self.previous.shape: raise ValueError('All frames of a GIF must have the same size')
+            changed = (rgb != self.previous).any(axis=2)
+            rows = np.flatnonzero(changed.any(axis=1))
+            if not len(rows): # nothing changed, the previous frame is shown longer
+                self.pending[2] += duration
+                self.stats['skipped'] += 1
+                return
+            columns = np.flatnonzero(changed.any(axis=0))
+            top, bottom, left, right = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+        self.previous = np.array(rgb) # a copy, the caller may reuse the buffer of the frame
+        region = rgb[top:bottom, left:right]
+        if changed is None: indexes, table, transparency = self.quantize(region)
+        else: # only changed pixels are converted, the rest of the box is transparent
+            changed = changed[top:bottom, left:right]
+            colors, table, transparency = self.quantize(region[changed])
+            indexes = np.full(changed.shape, transparency, dtype=np.uint8)
+            indexes[changed] = colors
+        image = Image.fromarray(indexes)
+        image.putpalette(table or self.palette.tableBytes())
+        if self.pending is None: self.writeHeader(rgb.shape[1], rgb.shape[0])
+        else: self.writeFrame(*self.pending)
+        self.pending = [image, (int(left), int(top)), duration, table is not None, None if changed is None else transparency]
+        self.stats['written_pixels'] += image.width*image.height
+
+    def quantize(self, region):
+        # (palette indexes, local color table or None, transparent index) of the pixels: in the global
+        # palette, or in its own palette if the colors don't fit. A local palette has one unused entry
+        # for the transparent index and is padded to the nearest size of a GIF color table.
+        if self.palette is None: self.palette = Palette(region)
+        indexes, error = self.palette.convert(region)
+        if error <= MAX_COLOR_ERROR: return indexes, None, TRANSPARENT
+        self.stats['local_palettes'] += 1
+        palette = Palette(region)
+        table_size = 2
+        while table_size <= len(palette.colors): table_size *= 2
+        return palette.convert(region)[0], palette.tableBytes(table_size), len(palette.colors)
+
+    def writeHeader(self, width, height):
+        # GIF89a, logical screen with the global color table of 256 colors (flags 0xF7), NETSCAPE loop extension
+        self.file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF7, 0, 0))
+        self.file.write(self.palette.tableBytes())
+        self.file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', self.loop) + b'\x00')
+
+    def writeFrame(self, image, offset, duration, local, transparency):
+        for data in GifImagePlugin.getdata(image, offset, duration=duration, transparency=transparency, disposal=1,
+                include_color_table=local):
+            self.file.write(data)
+
+    def close(self):
+        if self.file.closed: return
+        if self.pending is not None:
+            self.writeFrame(*self.pending)
+            self.file.write(b';') # trailer
+        self.file.close()
@@ -0,0 +1,51 @@
+# Visual downsampling of long series before they are animated. A line drawn over a few hundred pixels
+# can't show more than about one point per pixel, so the series is reduced to that many points:
+#   lttb         - Largest-Triangle-Three-Buckets: one point per bucket, the one making the largest
+#                  triangle with the point chosen in the previous bucket and the mean of the next bucket
+#                  (keeps the shape of the line, peaks included)
+#   minmax       - the lowest and the highest point of every bucket (keeps the whole range of values)
+# The functions return sorted indexes of the kept points, the first and the last point are always kept,
+# so the same indexes can select years, values and anything else stored per point.
+#   kept = downsample(years, values, max_points=int(ax.bbox.width))
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(x, y, threshold):
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    count = len(x)
+    if threshold >= count or threshold < 3: return np.arange(count)
+    every = (count - 2)/(threshold - 2) # bucket size, the first and the last point are buckets of their own
+    kept = np.zeros(threshold, dtype=np.int64)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = int(bucket*every) + 1, int((bucket + 1)*every) + 1
+        next_stop = min(int((bucket + 2)*every) + 1, count)
+        mean_x, mean_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        # doubled areas of triangles (previous point, candidate, mean of the next bucket)
+        areas = np.abs((x[previous] - mean_x)*(y[start:stop] - y[previous]) - (x[previous] - x[start:stop])*(mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    kept[-1] = count - 1
+    return kept
+
+
+def minMax(x, y, buckets):
+    # buckets are equal ranges of x (columns of pixels), not equal numbers of points
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y)
+    count = len(y)
+    if 2*buckets + 2 >= count or buckets < 1: return np.arange(count)
+    span = (x[-1] - x[0]) or 1.0
+    bucket_ids = np.minimum(((x - x[0])/span*buckets).astype(np.int64), buckets - 1)
+    order = np.lexsort((y, bucket_ids)) # by bucket, in a bucket by value
+    starts = np.flatnonzero(np.diff(bucket_ids[order], prepend=-1))
+    stops = np.append(starts[1:], count) - 1
+    return np.unique(np.concatenate([[0, count - 1], order[starts], order[stops]]))
+
+
+def downsample(x, y, max_points, method='lttb'):
+    # Indexes of at most about max_points points of the series (x sorted)
+    if method not in METHODS: raise ValueError(f'Unknown downsampling method: {method}, use one of {METHODS}')
+    if method == 'lttb': return lttb(x, y, max_points)
+    return minMax(x, y, max(max_points//2 - 1, 1))
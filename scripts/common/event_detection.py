@@ -0,0 +1,108 @@
+# Detection of events in population series, used to slow down and annotate animations automatically
+# instead of hardcoding years of interest:
+#   overtake - country A gets ahead of country B (their ranks cross between two consecutive years),
+#              found from rank changes between consecutive years (one sort of the rows per year)
+#   level    - sudden change of the growth rate, year-over-year change far from the usual change of the series
+#              (more than deviations x median absolute deviation and at least min_change)
+# Events are dictionaries: {'year', 'column', 'type', 'country', 'other', 'change', 'text'}.
+import numpy as np
+from common.growth_analytics import yearOverYear
+
+
+def rankVectors(dataset, rows=None):
+    # Rank of every country in every year among the given rows (all if None), 0 - the most populated.
+    # Returns float array len(rows) x years with nan where population is unknown.
+    rows = np.arange(len(dataset.names)) if rows is None else np.asarray(rows)
+    known = dataset.mask[rows] & (dataset.values[rows] > 0)
+    keys = np.where(known, dataset.values[rows], -1)
+    order = np.argsort(-keys, axis=0, kind='stable')
+    ranks = np.empty(keys.shape)
+    np.put_along_axis(ranks, order, np.arange(len(rows))[:, None].astype(np.float64), axis=0)
+    ranks[~known] = np.nan
+    return ranks
+
+
+def rankOvertakes(dataset, rows=None, ranks=None, max_rank=None):
+    # Overtakes among the given rows. ranks - rank vectors of the rows (rankVectors among the rows if None),
+    # ranks of the whole dataset can be given to find overtakes in the global ranking.
+    # With max_rank only overtakes after which the country is ranked before max_rank are returned.
+    # For every two consecutive years the rows known in both are sorted by their rank in the first year,
+    # a row overtakes the rows before it which are ranked after it in the second year. Only rows moved
+    # ahead of some row before them are compared, so no pairs of all rows are built.
+    rows = np.arange(len(dataset.names)) if rows is None else np.asarray(rows)
+    ranks = rankVectors(dataset, rows) if ranks is None else ranks
+    known = ~np.isnan(ranks)
+    events = []
+    for column in range(1, ranks.shape[1]):
+        both = np.flatnonzero(known[:, column - 1] & known[:, column])
+        order = both[np.argsort(ranks[both, column - 1], kind='stable')]
+        current = ranks[order, column]
+        moved = current < np.maximum.accumulate(current)
+        if max_rank is not None: moved &= current < max_rank
+        for position in np.flatnonzero(moved):
+            a = order[position]
+            country = str(dataset.names[rows[a]])
+            for b in order[:position][current[:position] > current[position]]:
+                other = str(dataset.names[rows[b]])
+                events.append({'year': int(dataset.years.values[column]), 'column': column, 'type': 'overtake',
+                    'country': country, 'other': other, 'change': float(ranks[a, column - 1] - ranks[a, column]),
+                    'text': f'{country.upper()} OVERTAKES {other.upper()}'})
+    return events
+
+
+def levelChanges(dataset, rows=None, min_change=0.015, deviations=3):
+    # Years where the year-over-year change of a series differs from its median change by more than
+    # deviations x median absolute deviation and at least min_change (0.015 = 1.5 percentage points)
+    rows = np.arange(len(dataset.names)) if rows is None else np.asarray(rows)
+    change = yearOverYear(dataset)[rows]
+    with np.errstate(invalid='ignore'):
+        median = np.nanmedian(np.where(np.isnan(change).all(axis=1, keepdims=True), 0, change), axis=1, keepdims=True)
+        spread = np.nanmedian(np.abs(change - median), axis=1, keepdims=True)
+        sudden = np.abs(change - median) > np.maximum(min_change, deviations*np.nan_to_num(spread))
+    events = []
+    for row, column in zip(*np.nonzero(sudden)):
+        country = str(dataset.names[rows[row]])
+        if change[row, column] > median[row, 0]: word = 'GROWTH'
+        else: word = 'DROP' if change[row, column] < 0 else 'SLOWDOWN'
+        events.append({'year': int(dataset.years.values[column]), 'column': int(column), 'type': 'level',
+            'country': country, 'other': None, 'change': float(change[row, column]),
+            'text': f'{word} OF {country.upper()} ({change[row, column]*100:+.1f}%)'})
+    return events
+
+
+def detectEvents(dataset, rows=None, top_n=20, min_change=0.015, deviations=3):
+    # Events of the given rows (all countries if None), sorted by year. Only rows which are in the top_n
+    # of their ranking in at least one year are searched, so there are few enough events to annotate
+    # (top_n=None - all rows). Overtakes are found in the ranking of all given rows, only those which
+    # happen in its top_n.
+    rows = np.arange(len(dataset.names)) if rows is None else np.asarray(rows)
+    ranks = rankVectors(dataset, rows)
+    if top_n is not None:
+        with np.errstate(invalid='ignore'):
+            candidates = np.flatnonzero((ranks < top_n).any(axis=1))
+        rows, ranks = rows[candidates], ranks[candidates]
+    events = rankOvertakes(dataset, rows, ranks, top_n)
+    events += levelChanges(dataset, rows, min_change, deviations)
+    events.sort(key=lambda x: (x['year'], x['type'], x['country']))
+    return events
+
+
+def eventWindows(events, before=0, after=2):
+    # Merges years around events into windows: list of (first_year, last_year, list of events)
+    windows = []
+    for event in sorted(events, key=lambda x: x['year']):
+        if windows and event['year'] - before <= windows[-1][1] + 1:
+            windows[-1][1] = max(windows[-1][1], event['year'] + after)
+            windows[-1][2].append(event)
+        else:
+            windows.append([event['year'] - before, event['year'] + after, [event]])
+    return [tuple(i) for i in windows]
+
+
+def slowedDownFrames(years, windows, repeat=6):
+    # Frames of the animation (year labels) with every year of the windows repeated repeat times
+    frames = []
+    for year in years:
+        slowed = any(first <= int(year) <= last for first, last, _ in windows)
+        frames.extend([year]*(repeat if slowed else 1))
+    return frames
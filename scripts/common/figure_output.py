@@ -0,0 +1,55 @@
+# Output stage for static figures. The figure is drawn once by Agg and every raster format
+# (png, jpg, ...) is written from that single buffer. Vector formats (pdf, svg, eps) are written
+# from the same figure, but axes holding many bars/patches get their collections rasterized,
+# so text, ticks and spines stay as vectors while thousands of intervals become one embedded image.
+import os
+import numpy as np
+from PIL import Image
+
+RASTER_FORMATS = ('png', 'jpg', 'jpeg', 'tif', 'tiff', 'webp', 'bmp')
+VECTOR_FORMATS = ('pdf', 'svg', 'eps', 'ps')
+
+
+def countCollectionItems(ax):
+    # Number of separate paths (e.g. bars of broken_barh) drawn by collections of one axes
+    return sum(len(collection.get_paths()) for collection in ax.collections)
+
+
+def rasterizeDenseCollections(fig, max_vector_items):
+    # Marks collections as rasterized in every axes that holds more than max_vector_items paths.
+    # Returns list of (collection, previous_flag) so the change can be reverted.
+    changed = []
+    for ax in fig.axes:
+        if countCollectionItems(ax) <= max_vector_items: continue
+        for collection in ax.collections:
+            changed.append((collection, collection.get_rasterized()))
+            collection.set_rasterized(True)
+    return changed
+
+
+def saveFigure(fig, file_names, dpi=200, max_vector_items=500):
+    # Writes fig to all files from file_names, format is taken from the extension.
+    # dpi - resolution of rasterized parts of vector files
+    # max_vector_items - axes with more bars than that get their collections rasterized in vector files
+    raster_files, vector_files = [], []
+    for file_name in file_names:
+        extension = os.path.splitext(file_name)[1][1:].lower()
+        if extension in RASTER_FORMATS: raster_files.append(file_name)
+        elif extension in VECTOR_FORMATS: vector_files.append((file_name, extension))
+        else: raise ValueError(f'Unsupported output format: {file_name}')
+
+    if raster_files:
+        # single Agg draw shared by all raster outputs (and by plt.show() afterwards)
+        fig.canvas.draw()
+        image = Image.fromarray(np.asarray(fig.canvas.buffer_rgba()))
+        for file_name in raster_files:
+            if file_name.lower().endswith(('.jpg', '.jpeg', '.bmp')): image.convert('RGB').save(file_name)
+            else: image.save(file_name)
+
+    if vector_files:
+        changed = rasterizeDenseCollections(fig, max_vector_items)
+        try:
+            for file_name, extension in vector_files:
+                fig.savefig(file_name, dpi=dpi, format=extension)
+        finally:
+            for collection, flag in changed: collection.set_rasterized(flag)
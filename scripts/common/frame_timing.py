@@ -0,0 +1,66 @@
+# Per-frame stage timing for animated generators. FrameTimer is a render instrument
+# (see animation_output.py) recording how long every stage of every frame took:
+# update (animationFunction), draw (Agg), rasterize and encode, plus parsing, preparing and writing the file.
+# After rendering it prints a summary with p50/p95/max per stage and optionally writes a trace file
+# in Chrome trace event format (open it in chrome://tracing or https://ui.perfetto.dev).
+# Usage: generator(..., render_options=RenderOptions(instruments=[FrameTimer(trace_file='trace.json')]))
+import json
+import time
+import numpy as np
+from common.animation_output import RenderInstrument
+
+STAGE_ORDER = ['parse', 'prepare', 'init', 'update', 'draw', 'rasterize', 'encode', 'write']
+
+
+class FrameTimer(RenderInstrument):
+    def __init__(self, trace_file=None, print_summary=True):
+        self.trace_file = trace_file
+        self.print_summary = print_summary
+        self.output_file_name = None
+        self.render_start = None
+        self.started = {} # key-stage name, value-start time of the running stage
+        self.records = [] # tuples (stage, frame, start, duration), times in seconds
+
+    def startRender(self, output_file_name, writer):
+        self.output_file_name = output_file_name
+
+    def startStage(self, stage, frame):
+        self.started[stage] = time.perf_counter()
+        if self.render_start is None: self.render_start = self.started[stage]
+
+    def endStage(self, stage, frame):
+        end = time.perf_counter()
+        start = self.started.pop(stage)
+        self.records.append((stage, frame, start - self.render_start, end - start))
+
+    def endRender(self, writer):
+        if self.print_summary: print(self.report())
+        if self.trace_file: self.writeTrace(self.trace_file)
+
+    def summary(self):
+        # Returns dictionary where each key is a stage name and each value a dictionary with
+        # number of calls and p50/p95/max/total durations in seconds
+        durations = {}
+        for stage, _, _, duration in self.records: durations.setdefault(stage, []).append(duration)
+        stages = sorted(durations, key=lambda x: STAGE_ORDER.index(x) if x in STAGE_ORDER else len(STAGE_ORDER))
+        return {stage: {
+            'count': len(durations[stage]),
+            'p50': float(np.percentile(durations[stage], 50)),
+            'p95': float(np.percentile(durations[stage], 95)),
+            'max': max(durations[stage]),
+            'total': sum(durations[stage]),
+        } for stage in stages}
+
+    def report(self):
+        lines = [f'Frame timing of {self.output_file_name} [ms]',
+            f'{"stage":<10}{"count":>7}{"p50":>10}{"p95":>10}{"max":>10}{"total":>11}']
+        for stage, values in self.summary().items():
+            lines.append(f'{stage:<10}{values["count"]:>7}{values["p50"]*1000:>10.2f}{values["p95"]*1000:>10.2f}'
+                f'{values["max"]*1000:>10.2f}{values["total"]*1000:>11.1f}')
+        return '\n'.join(lines)
+
+    def writeTrace(self, file_name):
+        events = [{'name': stage, 'cat': 'render', 'ph': 'X', 'pid': 0, 'tid': 0, 'ts': start*1e6,
+            'dur': duration*1e6, 'args': {'frame': frame}} for stage, frame, start, duration in self.records]
+        with open(file_name, 'w') as file:
+            json.dump({'traceEvents': events, 'otherData': {'output': self.output_file_name}}, file)
@@ -0,0 +1,88 @@
+# Growth analytics of all series of a PopulationDataset at once: year-over-year change, CAGR,
+# rolling means and doubling times are computed with array operations on the countries x years matrix
+# instead of loops over countries and years.
+# Every function returns a float array aligned with dataset.values (rows - countries, columns - years)
+# with nan where the result can't be computed (missing values, not enough years, non-positive sizes).
+# Gaps in the year axis are taken into account: changes between columns are annualized by the
+# number of years between them.
+# metricDataset turns such an array into a dataset, which can be written with writeCsv and used
+# as file_name of the bar, line and bubble generators:
+#   growth = metricDataset(dataset, yearOverYear(dataset)*100)
+#   growth.writeCsv('growth.csv', scale=1000000) # the generators' [mln] axis then reads in percent
+import numpy as np
+from common.population_dataset import PopulationDataset
+
+
+def positiveValues(dataset):
+    # Values as floats with nan where unknown or not positive (rates and logarithms need positive sizes)
+    return np.where(dataset.mask & (dataset.values > 0), dataset.values, np.nan).astype(np.float64)
+
+
+def shiftedColumns(years, window):
+    # For every column the column window years earlier and True where that year is on the axis
+    wanted = years.values - window
+    columns = np.clip(np.searchsorted(years.values, wanted), 0, len(years) - 1)
+    return columns, years.values[columns] == wanted
+
+
+def yearOverYear(dataset, relative=True):
+    # Change from the previous column, per year: relative (0.01 = 1% a year) or absolute
+    values = positiveValues(dataset) if relative else np.where(dataset.mask, dataset.values, np.nan).astype(np.float64)
+    change = np.full(values.shape, np.nan)
+    gaps = np.diff(dataset.years.values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if relative:
+            change[:, 1:] = (values[:, 1:]/values[:, :-1])**(1/gaps) - 1
+        else:
+            change[:, 1:] = (values[:, 1:] - values[:, :-1])/gaps
+    return change
+
+
+def cagr(dataset, window):
+    # Compound annual growth rate over the last window years, for every country and year
+    values = positiveValues(dataset)
+    columns, known = shiftedColumns(dataset.years, window)
+    rates = np.full(values.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates[:, known] = (values[:, known]/values[:, columns[known]])**(1/window) - 1
+    return rates
+
+
+def cagrBetween(dataset, start_year, end_year):
+    # CAGR of every country between two years, array with one value per country
+    start, end = dataset.years.index(start_year), dataset.years.index(end_year)
+    values = positiveValues(dataset)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values[:, end]/values[:, start])**(1/(int(end_year) - int(start_year))) - 1
+
+
+def rollingMean(series, window, min_periods=1):
+    # Mean of the last window columns of every row of a float array (e.g. of yearOverYear),
+    # over known values only, computed from cumulative sums. nan where less than min_periods are known.
+    known = ~np.isnan(series)
+    sums = np.zeros((series.shape[0], series.shape[1] + 1))
+    counts = np.zeros((series.shape[0], series.shape[1] + 1))
+    np.cumsum(np.where(known, series, 0), axis=1, out=sums[:, 1:])
+    np.cumsum(known, axis=1, out=counts[:, 1:])
+    starts = np.maximum(np.arange(series.shape[1]) + 1 - window, 0)
+    window_sums = sums[:, 1:] - sums[:, starts]
+    window_counts = counts[:, 1:] - counts[:, starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts >= min_periods, window_sums/window_counts, np.nan)
+
+
+def doublingTime(dataset, window=10):
+    # Years needed to double the population at the CAGR of the last window years (nan if not growing)
+    rates = cagr(dataset, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(rates > 0, np.log(2)/np.log1p(rates), np.nan)
+
+
+def metricDataset(dataset, metric):
+    # Dataset with the same countries and the metric as values (mask - where metric is finite).
+    # Leading years without any value (the first year of yearOverYear, first window years of cagr)
+    # are dropped, because the generators start the animation from the first year.
+    known = np.isfinite(metric)
+    first = int(np.argmax(known.any(axis=0)))
+    return PopulationDataset.fromArrays(dataset.names, dataset.codes, dataset.years.values[first:],
+        np.where(known, metric, 0)[:, first:], known[:, first:])
@@ -0,0 +1,178 @@
+# Export of an animated chart as one self-contained .html file instead of a GIF: the data of the frames
+# (years x countries matrix of values, float32 in base64) with colors and labels, and a small canvas
+# player which draws the frames in the browser. Nothing is rasterized, so the file has a few KB,
+# it is written almost at once, and the chart can be paused, moved to any year and hovered
+# (the tooltip shows the country and its value).
+# Generators write .html instead of .gif when the output file name ends with .html:
+#   exportChart('a_final.html', 'bar', years, codes, colors, values, names=names, title='Population size by year')
+# Chart types: bar, line, bubble (sizes - years x countries matrix of bubble areas), pie.
+import base64
+import html
+import json
+import numpy as np
+
+CHART_TYPES = ('bar', 'line', 'bubble', 'pie')
+
+PLAYER = r'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: sans-serif; margin: 10px; }
+canvas { display: block; }
+#controls { display: flex; gap: 10px; align-items: center; width: 1040px; }
+#frame { flex: 1; }
+</style>
+</head>
+<body>
+<canvas id="chart" width="1040" height="440"></canvas>
+<div id="controls"><button id="play">Pause</button><input id="frame" type="range" min="0" value="0"></div>
+<script id="chart-data" type="application/json">__DATA__</script>
+<script>
+const chart = JSON.parse(document.getElementById('chart-data').textContent);
+const decode = text => text ? new Float32Array(Uint8Array.from(atob(text), c => c.charCodeAt(0)).buffer) : null;
+const values = decode(chart.values), sizes = decode(chart.sizes), years = chart.years, count = chart.labels.length;
+const value = (frame, series) => values[frame*count + series];
+const canvas = document.getElementById('chart'), context = canvas.getContext('2d');
+const slider = document.getElementById('frame'), button = document.getElementById('play');
+const plot = {left: 80, right: canvas.width - 20, top: 50, bottom: canvas.height - 50};
+const y = v => plot.bottom - v/chart.max_value*(plot.bottom - plot.top);
+const yearX = year => plot.left + (year - years[0] + 1)/(years[years.length - 1] - years[0] + 5)*(plot.right - plot.left);
+const format = v => v.toFixed(2) + ' ' + chart.unit;
+let frame = 0, timer = null, regions = [];
+
+function text(content, x, y, font, align = 'center', baseline = 'middle', color = '#000') {
+  context.font = font; context.textAlign = align; context.textBaseline = baseline; context.fillStyle = color;
+  context.fillText(content, x, y);
+}
+
+function axes() {
+  // grid with a round step of the y axis, like ax.grid(axis='y')
+  const raw = chart.max_value/6, power = Math.pow(10, Math.floor(Math.log10(raw)));
+  const step = [1, 2, 5, 10].map(i => i*power).find(i => i >= raw);
+  context.strokeStyle = '#d4d4d4'; context.lineWidth = 1;
+  for (let v = 0; v <= chart.max_value; v += step) {
+    context.beginPath(); context.moveTo(plot.left, y(v)); context.lineTo(plot.right, y(v)); context.stroke();
+    text(String(Math.round(v*100)/100), plot.left - 6, y(v), '11px sans-serif', 'right');
+  }
+  context.strokeStyle = '#000'; context.strokeRect(plot.left, plot.top, plot.right - plot.left, plot.bottom - plot.top);
+  context.save(); context.translate(18, (plot.top + plot.bottom)/2); context.rotate(-Math.PI/2);
+  text(chart.y_label, 0, 0, 'bold 13px sans-serif'); context.restore();
+  text(chart.x_label, (plot.left + plot.right)/2, canvas.height - 12, 'bold 13px sans-serif');
+  if (chart.type != 'bar') for (let year = Math.ceil(years[0]/10)*10; year <= years[years.length - 1]; year += 10)
+    text(String(year), yearX(year), plot.bottom + 12, '11px sans-serif');
+}
+
+function bars() {
+  const width = (plot.right - plot.left)/count;
+  for (let i = 0; i < count; i++) {
+    const v = value(frame, i), x = plot.left + width*(i + 0.1);
+    context.fillStyle = chart.colors[i]; context.fillRect(x, y(v), width*0.8, plot.bottom - y(v));
+    text(chart.labels[i], x + width*0.4, y(v) - 4, '12px sans-serif', 'center', 'bottom');
+    text(chart.names[i], x + width*0.4, plot.bottom + 12, '11px sans-serif');
+    regions.push({x0: x, x1: x + width*0.8, y0: y(v), y1: plot.bottom, tip: chart.names[i] + ': ' + format(v)});
+  }
+}
+
+function lines() {
+  for (let i = 0; i < count; i++) {
+    context.strokeStyle = context.fillStyle = chart.colors[i]; context.lineWidth = 1.5; context.beginPath();
+    for (let f = 0; f <= frame; f++) context.lineTo(yearX(years[f]), y(value(f, i)));
+    context.stroke();
+    for (let f = 0; f <= frame; f++) {
+      context.beginPath(); context.arc(yearX(years[f]), y(value(f, i)), 2.5, 0, 2*Math.PI); context.fill();
+      regions.push({x0: yearX(years[f]) - 4, x1: yearX(years[f]) + 4, y0: y(value(f, i)) - 4, y1: y(value(f, i)) + 4,
+        tip: chart.names[i] + ', ' + years[f] + ': ' + format(value(f, i))});
+    }
+    text(chart.labels[i], yearX(years[frame]) + 8, y(value(frame, i)), '12px sans-serif', 'left');
+  }
+}
+
+function bubbles() {
+  // bubbles of every 7th year stay as a trail, like in the GIF
+  context.globalAlpha = 0.5;
+  for (let f = 0; f <= frame; f++) {
+    if (f != frame && years[f] % 7 != 0) continue;
+    for (let i = 0; i < count; i++) {
+      const radius = Math.sqrt(sizes[f*count + i])/2, cx = yearX(years[f]), cy = y(value(f, i));
+      context.fillStyle = chart.colors[i]; context.beginPath(); context.arc(cx, cy, radius, 0, 2*Math.PI); context.fill();
+      regions.push({x0: cx - radius, x1: cx + radius, y0: cy - radius, y1: cy + radius, tip: chart.names[i] + ', ' + years[f] + ': ' + format(value(f, i))});
+    }
+  }
+  context.globalAlpha = 1;
+  for (let i = 0; i < count; i++) text(chart.labels[i], yearX(years[frame]), y(value(frame, i)), '12px sans-serif');
+}
+
+function pie() {
+  let total = 0, angle = 0;
+  for (let i = 0; i < count; i++) total += value(frame, i);
+  const cx = canvas.width/2, cy = canvas.height/2 + 10, radius = 140;
+  for (let i = 0; i < count; i++) {
+    const v = value(frame, i), end = angle + v/total*2*Math.PI, middle = (angle + end)/2;
+    context.fillStyle = chart.colors[i]; context.beginPath(); context.moveTo(cx, cy);
+    context.arc(cx, cy, radius, -end, -angle); context.fill(); // counterclockwise from 3 o'clock like ax.pie
+    text(chart.labels[i] + ', ' + format(v) + ', ' + (v/total*100).toFixed(2) + '%', cx + Math.cos(middle)*radius*1.15,
+      cy - Math.sin(middle)*radius*1.15, '12px sans-serif', Math.cos(middle) < 0 ? 'right' : 'left');
+    angle = end;
+  }
+  text('Combined populations size: ' + format(total), cx, cy + radius + 40, 'bold 14px sans-serif');
+  regions.push({x0: cx - radius, x1: cx + radius, y0: cy - radius, y1: cy + radius, tip: chart.names.map((name, i) => name + ': ' + format(value(frame, i))).join('\n')});
+}
+
+function draw() {
+  regions = [];
+  context.fillStyle = chart.background; context.fillRect(0, 0, canvas.width, canvas.height);
+  text(chart.title, canvas.width/2, 22, 'bold 22px sans-serif');
+  if (chart.type == 'pie') { text(chart.x_label, canvas.width/2, 44, 'italic 12px sans-serif'); pie(); }
+  else {
+    context.fillStyle = '#fff'; context.fillRect(plot.left, plot.top, plot.right - plot.left, plot.bottom - plot.top);
+    axes(); ({bar: bars, line: lines, bubble: bubbles})[chart.type]();
+  }
+  context.fillStyle = '#fff'; context.fillRect(plot.left + 20, plot.top + 12, 76, 34); context.strokeStyle = '#d4d4d4';
+  context.strokeRect(plot.left + 20, plot.top + 12, 76, 34); text(String(years[frame]), plot.left + 58, plot.top + 30, '22px sans-serif');
+  slider.value = frame;
+}
+
+function play() {
+  timer = setInterval(() => { frame = (frame + 1) % years.length; draw(); }, chart.interval);
+  button.textContent = 'Pause';
+}
+button.onclick = () => { if (timer) { clearInterval(timer); timer = null; button.textContent = 'Play'; } else play(); };
+slider.max = years.length - 1;
+slider.oninput = () => { frame = Number(slider.value); draw(); };
+canvas.onmousemove = event => {
+  const box = canvas.getBoundingClientRect(), mx = event.clientX - box.left, my = event.clientY - box.top;
+  const region = regions.slice().reverse().find(r => mx >= r.x0 && mx <= r.x1 && my >= r.y0 && my <= r.y1);
+  canvas.title = region ? region.tip : '';
+};
+draw(); play();
+</script>
+</body>
+</html>
+'''
+
+
+def isHtmlOutput(output_file_name):
+    return output_file_name.lower().endswith('.html')
+
+
+def encodeMatrix(values):
+    # float32 values in base64 (little-endian, rows after rows), missing values as NaN
+    return base64.b64encode(np.asarray(values, dtype='<f4').tobytes()).decode('ascii') if values is not None else None
+
+
+def exportChart(output_file_name, chart_type, years, labels, colors, values, names=None, sizes=None, title='',
+        x_label='', y_label='Population size [mln]', unit='MLN', figure_color='white', max_value=None, interval=150):
+    # years - frames, labels - text drawn at every series (country codes), values - array years x series
+    if chart_type not in CHART_TYPES: raise ValueError(f'Unknown chart type: {chart_type}, use one of {CHART_TYPES}')
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape != (len(years), len(labels)): raise ValueError(f'values must be an array {len(years)} x {len(labels)}')
+    chart = {'type': chart_type, 'title': title, 'x_label': x_label, 'y_label': y_label, 'unit': unit,
+        'background': figure_color, 'interval': interval, 'years': [int(i) for i in years], 'labels': list(labels),
+        'names': list(names or labels), 'colors': list(colors[:len(labels)]),
+        'max_value': float(max_value or np.nanmax(values)*1.1), 'values': encodeMatrix(values), 'sizes': encodeMatrix(sizes)}
+    # </ can't end the script element the data is in
+    data = json.dumps(chart, separators=(',', ':')).replace('</', '<\\/')
+    with open(output_file_name, 'w', encoding='utf-8') as file:
+        file.write(PLAYER.replace('__TITLE__', html.escape(title)).replace('__DATA__', data))
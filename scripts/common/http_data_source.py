@@ -0,0 +1,135 @@
+# Data source fetching indicator data from The World Bank API (or a local mirror with the same API,
+# e.g. in offline CI) instead of downloading and correcting the .csv file by hand:
+#   source = HttpDataSource('https://api.worldbank.org/v2', cache_dir='http_cache')
+#   dataset = source.loadDataset('SP.POP.TOTL') # the same PopulationDataset readCsv produces
+# Pages of the answer are requested concurrently with asyncio over a pool of kept-alive connections.
+# Every answer is cached on disk with its ETag/Last-Modified headers, so a refresh sends conditional
+# requests and only pages which changed are downloaded again (the rest is answered with 304 Not Modified).
+# Aggregates (regions, income groups, World) are recognized by the region of the country in the API
+# and left out, like the groups removed by hand from data.csv.
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import queue
+import threading
+import urllib.parse
+import numpy as np
+from common.population_dataset import PopulationDataset
+
+
+class HttpDataSource:
+    def __init__(self, base_url='https://api.worldbank.org/v2', cache_dir='http_cache', connections=4,
+            per_page=1000, timeout=30):
+        url = urllib.parse.urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port, self.prefix = url.hostname, url.port, url.path.rstrip('/')
+        self.cache_dir = cache_dir
+        self.connections = connections
+        self.per_page = per_page
+        self.timeout = timeout
+        self.pool = queue.LifoQueue() # idle connections, reused by the next request
+        self.stats = {'requests': 0, 'not_modified': 0, 'downloaded_bytes': 0}
+        self.stats_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def close(self):
+        while not self.pool.empty(): self.pool.get().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def cacheFiles(self, path):
+        key = hashlib.sha1(path.encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json'), os.path.join(self.cache_dir, key + '.meta.json')
+
+    def get(self, path):
+        # Body of the answer for the path, from the cache if the server answers 304 Not Modified
+        body_file, meta_file = self.cacheFiles(path)
+        headers = {'Accept': 'application/json'}
+        if os.path.exists(meta_file) and os.path.exists(body_file):
+            with open(meta_file) as file: meta = json.load(file)
+            if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+        status, response_headers, body = self.request(path, headers)
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['not_modified'] += status == 304
+            self.stats['downloaded_bytes'] += len(body)
+        if status == 304:
+            with open(body_file, 'rb') as file: return file.read()
+        if status != 200: raise ConnectionError(f'{self.host}{path} answered {status}')
+        with open(body_file, 'wb') as file: file.write(body)
+        with open(meta_file, 'w') as file:
+            json.dump({'path': path, 'etag': response_headers.get('ETag'),
+                'last_modified': response_headers.get('Last-Modified')}, file)
+        return body
+
+    def request(self, path, headers):
+        # GET over a connection from the pool. A kept-alive connection closed by the server is opened again
+        # once, after a timeout or another network error the connection is closed and not returned to the pool.
+        try: connection = self.pool.get_nowait()
+        except queue.Empty: connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        for attempt in range(2):
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                if attempt: raise
+            except OSError: # also TimeoutError, the answer may still come on this connection later
+                connection.close()
+                raise
+        if response.will_close: connection.close()
+        else: self.pool.put(connection)
+        return response.status, response.headers, body
+
+    def path(self, resource, page):
+        return f'{self.prefix}/{resource}?format=json&per_page={self.per_page}&page={page}'
+
+    async def fetchPages(self, resource):
+        # Records of all pages of the resource, the first page tells how many pages there are
+        first = json.loads(await asyncio.to_thread(self.get, self.path(resource, 1)))
+        if len(first) < 2: raise ValueError(f'{resource}: {first[0]}') # API errors are answered as [message]
+        limit = asyncio.Semaphore(self.connections)
+
+        async def page(number):
+            async with limit:
+                return json.loads(await asyncio.to_thread(self.get, self.path(resource, number)))[1] or []
+        pages = await asyncio.gather(*[page(i) for i in range(2, first[0]['pages'] + 1)])
+        return (first[1] or []) + [record for records in pages for record in records]
+
+    def fetch(self, resource):
+        return asyncio.run(self.fetchPages(resource))
+
+    def aggregateCodes(self):
+        # Codes of aggregates (their region in the API is "Aggregates", id NA)
+        return {i['id'] for i in self.fetch('country') if i['region']['id'] == 'NA'}
+
+    def loadDataset(self, indicator_code='SP.POP.TOTL', include_aggregates=False):
+        # PopulationDataset of the indicator for all countries, in the order of the API (by name)
+        records = self.fetch(f'country/all/indicator/{indicator_code}')
+        skipped = set() if include_aggregates else self.aggregateCodes()
+        rows, names, codes, cells = {}, [], [], []
+        for record in records:
+            code = record['countryiso3code'] or record['country']['id']
+            if code in skipped: continue
+            if code not in rows:
+                rows[code] = len(names)
+                names.append(record['country']['value'])
+                codes.append(code)
+            if record['value'] is not None: cells.append((rows[code], int(record['date']), record['value']))
+        years = sorted({int(i['date']) for i in records})
+        values, mask = np.zeros((len(names), len(years))), np.zeros((len(names), len(years)), dtype=bool)
+        if cells:
+            row_indexes, cell_years, cell_values = zip(*cells)
+            columns = np.searchsorted(years, cell_years)
+            values[list(row_indexes), columns], mask[list(row_indexes), columns] = cell_values, True
+        if (values == np.round(values)).all(): values = values.astype(np.int64) # population sizes are integers
+        return PopulationDataset.fromArrays(names, codes, years, values, mask)
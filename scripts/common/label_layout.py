@@ -0,0 +1,82 @@
+# Placement of text labels (country codes next to lines or on bubbles) without overlaps.
+# Every frame the labels are moved to their data points, and a label which would overlap an already
+# placed label is shifted up or down by steps of half of its height to the nearest free place in the axes.
+# Placed labels are kept in a uniform grid of cells (a dictionary cell -> labels in it), so a label is
+# compared only with labels in the cells its box covers, not with all labels of the frame.
+# Labels are placed in the order of their points from the bottom, so a crowd of labels is stacked
+# around its points instead of being pushed far away by labels placed before.
+# To keep labels from jumping between frames, a label keeps the shift it had in the previous frame
+# unless a place closer to its point is free, and it moves to a new shift gradually where that
+# doesn't make it overlap other labels.
+#   layout = LabelLayout(ax, texts)
+#   layout.place(x_values, y_values) # data coordinates of the points, in animationFunction
+import numpy as np
+
+ALIGNMENT = {'left': 0.0, 'center': 0.5, 'right': 1.0, 'top': 1.0, 'bottom': 0.0, 'baseline': 0.0, 'center_baseline': 0.5}
+
+
+class LabelLayout:
+    def __init__(self, ax, labels, padding=2, max_steps=32, smoothing=0.5):
+        self.ax = ax
+        self.labels = labels # matplotlib Text objects
+        self.padding = padding # free pixels between labels
+        self.max_steps = max_steps # the furthest shift in halves of the label height, a label without free place stays at its point
+        self.smoothing = smoothing # 0 - labels jump to the new place, closer to 1 - they move slower
+        self.shifts = None # vertical shifts of the drawn labels in pixels
+        self.sizes = {} # key-(text, font size, dpi), value-(width, height) in pixels
+
+    def labelSizes(self):
+        # Widths and heights of the labels in pixels, measured once for every text and dpi
+        renderer = self.ax.figure.canvas.get_renderer()
+        dpi = self.ax.figure.dpi
+        sizes = []
+        for label in self.labels:
+            key = (label.get_text(), label.get_fontsize(), dpi)
+            if key not in self.sizes:
+                extent = label.get_window_extent(renderer)
+                self.sizes[key] = (extent.width + self.padding, extent.height + self.padding)
+            sizes.append(self.sizes[key])
+        return np.array(sizes).reshape(-1, 2)
+
+    def place(self, x_values, y_values):
+        points = self.ax.transData.transform(np.column_stack([x_values, y_values]))
+        sizes = self.labelSizes()
+        # lower left corners of the label boxes at their points
+        corners = points - sizes*[[ALIGNMENT[i.get_horizontalalignment()], ALIGNMENT[i.get_verticalalignment()]]
+            for i in self.labels]
+        previous = self.shifts if self.shifts is not None else np.zeros(len(self.labels))
+        smoothing = self.smoothing if self.shifts is not None else 0.0
+        cell_size = max(sizes.max(), 1) if len(sizes) else 1
+        bottom, top = self.ax.bbox.y0, self.ax.bbox.y1 # labels are not moved out of the axes
+        grid = {}
+        boxes = []
+        self.shifts = np.zeros(len(self.labels))
+        for index in np.argsort(points[:, 1], kind='stable'):
+            (x, y), (width, height) = corners[index], sizes[index]
+            # the nearest free place, the shift of the previous frame wins over other places as close to the point
+            candidates = [previous[index]] + [step*height/2 for k in range(self.max_steps + 1) for step in ((k, -k) if k else (0,))]
+            candidates = sorted((i for i in candidates if bottom <= y + i and y + i + height <= top), key=abs)
+            target = next((i for i in candidates if not self.overlaps(grid, boxes, (x, y + i, x + width, y + i + height), cell_size)), 0.0)
+            # the label moves only a part of the way, unless the label would overlap another one there
+            shift = smoothing*previous[index] + (1 - smoothing)*target
+            if self.overlaps(grid, boxes, (x, y + shift, x + width, y + shift + height), cell_size): shift = target
+            self.shifts[index] = shift
+            self.addBox(grid, boxes, (x, y + shift, x + width, y + shift + height), cell_size)
+        positions = self.ax.transData.inverted().transform(points + np.column_stack([np.zeros(len(points)), self.shifts]))
+        for label, position in zip(self.labels, positions): label.set_position(position)
+
+    def cells(self, box, cell_size):
+        for column in range(int(box[0]//cell_size), int(box[2]//cell_size) + 1):
+            for row in range(int(box[1]//cell_size), int(box[3]//cell_size) + 1):
+                yield column, row
+
+    def overlaps(self, grid, boxes, box, cell_size):
+        for cell in self.cells(box, cell_size):
+            for other in grid.get(cell, ()):
+                other = boxes[other]
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]: return True
+        return False
+
+    def addBox(self, grid, boxes, box, cell_size):
+        for cell in self.cells(box, cell_size): grid.setdefault(cell, []).append(len(boxes))
+        boxes.append(box)
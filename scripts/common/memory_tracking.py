@@ -0,0 +1,131 @@
+# Memory instrumentation for generators. MemoryTracker is a render instrument (see animation_output.py)
+# sampling memory at the end of parse and prepare stages, after every N frames and after writing the file:
+#   rss            - current resident set size of the process
+#   peak rss       - highest resident set size so far
+#   traced/peak    - Python allocations traced by tracemalloc, current and highest since the previous sample
+#   frame buffers  - number (and size) of frames the writer holds in memory (PillowWriter keeps all of them
+#                    until the file is written)
+# With memory_limit_mb set, rendering stops with MemoryError as soon as RSS goes over the limit,
+# instead of waiting for the OOM killer.
+# Usage: generator(..., render_options=RenderOptions(instruments=[MemoryTracker(every_n_frames=10, memory_limit_mb=2000)]))
+import json
+import os
+import sys
+import tracemalloc
+from common.animation_output import RenderInstrument
+
+try: import resource
+except ImportError: resource = None # not available on Windows
+
+MB = 1024*1024
+FRAME_STAGES = ('update', 'draw', 'rasterize', 'encode')
+
+
+def peakRss():
+    # Highest resident set size of the process in bytes (None if unknown)
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak*1024 # kilobytes on Linux, bytes on macOS
+
+
+def currentRss():
+    # Current resident set size in bytes, falls back to the peak where /proc is not available
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return peakRss()
+
+
+def frameBuffers(writer):
+    # Returns (count, bytes) of frames held by the writer
+    frames = getattr(writer, '_frames', None) or []
+    return len(frames), sum(i.width*i.height*len(i.getbands()) for i in frames)
+
+
+class MemoryTracker(RenderInstrument):
+    def __init__(self, every_n_frames=10, memory_limit_mb=None, report_file=None, print_summary=True):
+        self.every_n_frames = every_n_frames
+        self.memory_limit_mb = memory_limit_mb
+        self.report_file = report_file
+        self.print_summary = print_summary
+        self.output_file_name = None
+        self.writer = None
+        self.frame_end_stage = 'update'
+        self.group_start = 0
+        self.last_frame = None
+        self.started_tracing = False
+        self.limit_exceeded = False
+        self.samples = []
+
+    def startRender(self, output_file_name, writer):
+        self.output_file_name = output_file_name
+        self.writer = writer
+        # the last stage of each frame, depends on whether frames are grabbed by a staged writer
+        self.frame_end_stage = 'encode' if writer is not None else 'update'
+
+    def startStage(self, stage, frame):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        if stage not in FRAME_STAGES or (stage == 'update' and frame == self.group_start):
+            tracemalloc.reset_peak()
+
+    def endStage(self, stage, frame):
+        if stage in FRAME_STAGES:
+            self.last_frame = frame
+            if stage == self.frame_end_stage and (frame+1) % self.every_n_frames == 0: self.sampleFrames()
+        else:
+            if stage == 'write': self.sampleFrames()
+            self.sample(stage)
+        self.checkLimit(stage, frame)
+
+    def endRender(self, writer):
+        self.sampleFrames()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        if self.print_summary: print(self.report())
+        if self.report_file:
+            with open(self.report_file, 'w') as file:
+                json.dump({'output': self.output_file_name, 'samples': self.samples}, file, indent=2)
+
+    def sampleFrames(self):
+        # Sample of frames rendered since the previous one (if there are any)
+        if self.last_frame is None or self.last_frame < self.group_start: return
+        self.sample(f'frames {self.group_start}-{self.last_frame}')
+        self.group_start = self.last_frame + 1
+
+    def sample(self, stage):
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        buffers, buffers_size = frameBuffers(self.writer)
+        rss, peak = currentRss(), peakRss()
+        self.samples.append({
+            'stage': stage,
+            'rss_mb': rss/MB if rss is not None else None,
+            'peak_rss_mb': peak/MB if peak is not None else None,
+            'traced_mb': traced/MB,
+            'traced_peak_mb': traced_peak/MB,
+            'frame_buffers': buffers,
+            'frame_buffers_mb': buffers_size/MB,
+        })
+
+    def checkLimit(self, stage, frame):
+        if self.memory_limit_mb is None or self.limit_exceeded: return
+        rss = currentRss()
+        if rss is not None and rss/MB > self.memory_limit_mb:
+            self.limit_exceeded = True # reported once, writer still closes the file after the error
+            buffers, buffers_size = frameBuffers(self.writer)
+            where = stage if frame is None else f'{stage} of frame {frame}'
+            raise MemoryError(f'RSS {rss/MB:.0f} MB exceeded the limit of {self.memory_limit_mb} MB during {where} '
+                f'({buffers} frame buffers held, {buffers_size/MB:.1f} MB)')
+
+    def report(self):
+        def formatted(value): return f'{value:>10.1f}' if value is not None else f'{"-":>10}'
+        lines = [f'Memory usage of {self.output_file_name} [MB]',
+            f'{"stage":<16}{"rss":>10}{"peak rss":>10}{"traced":>10}{"peak":>10}{"buffers":>9}{"size":>10}']
+        for i in self.samples:
+            lines.append(f'{i["stage"]:<16}{formatted(i["rss_mb"])}{formatted(i["peak_rss_mb"])}'
+                f'{formatted(i["traced_mb"])}{formatted(i["traced_peak_mb"])}{i["frame_buffers"]:>9}'
+                f'{formatted(i["frame_buffers_mb"])}')
+        return '\n'.join(lines)
@@ -0,0 +1,72 @@
+# Index used to join auxiliary tables (country sizes, areas, GDP, regions, ...) to rows of the population data.
+# Names are normalized before lookup, so small differences between sources don't break the join:
+# case, accents, punctuation, "St." vs "Saint", "&" vs "and" and "Bahamas, The" vs "The Bahamas".
+# Keys that are country codes (ISO3 codes used by The World Bank) are matched by code.
+# Lookups are dictionary (hash) lookups, so joining a table costs O(1) per line.
+# A name which normalizes to the same key as another name of the data is ambiguous, keys matching it
+# by name are not joined to any row but reported (codes still match their own row).
+import re
+import unicodedata
+
+ARTICLE = re.compile(r'^the\s+|\s+the$')
+
+
+def normalizeName(name):
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(i for i in name if not unicodedata.combining(i)).casefold()
+    name = name.replace('&', ' and ')
+    name = re.sub(r"\bst\.?(?=\s)", 'saint', name)
+    name = re.sub(r"['’`]", '', name) # Cote d'Ivoire -> cote divoire
+    name = re.sub(r'[^0-9a-z]+', ' ', name).strip()
+    return ARTICLE.sub('', name)
+
+
+class NameIndex:
+    def __init__(self, names, codes=None, aliases=None):
+        # names, codes - sequences aligned with rows of the data
+        # aliases - dictionary where each key is an alternative name and each value a name from names
+        self.name_keys = {} # key-normalized name, value-row
+        self.code_keys = {} # key-country code, value-row
+        self.ambiguous = {} # key-normalized name shared by several names, value-list of those names
+        self.names = [] # names of the rows, used to report ambiguous names
+        self.add(names, codes)
+        for alias, name in (aliases or {}).items():
+            self.name_keys[normalizeName(alias)] = self.name_keys[normalizeName(name)]
+
+    def add(self, names, codes=None):
+        # Adds rows after the already indexed ones (countries appended to the data)
+        first_row = len(self.names)
+        for row, name in enumerate(names, first_row):
+            self.names.append(str(name))
+            key = normalizeName(str(name))
+            if key in self.name_keys:
+                self.ambiguous.setdefault(key, [self.names[self.name_keys[key]]]).append(str(name))
+                continue
+            self.name_keys[key] = row
+        if codes is not None:
+            self.code_keys.update({str(code).upper(): row for row, code in enumerate(codes, first_row) if code})
+
+    def find(self, key):
+        # Row of the given name or code, None if there is no such country
+        key = key.strip()
+        row = self.code_keys.get(key.upper()) if key.isalpha() and len(key) <= 3 else None
+        if row is None: row = self.name_keys.get(normalizeName(key))
+        return row
+
+    def findAmbiguous(self, key):
+        # Names of the data the key could mean if it matches several of them by name, None otherwise
+        key = key.strip()
+        if key.isalpha() and len(key) <= 3 and key.upper() in self.code_keys: return None
+        return self.ambiguous.get(normalizeName(key))
+
+    def join(self, keys):
+        # Returns (rows, unmatched, ambiguous): row for every key (-1 if not found or ambiguous), list of keys
+        # not found and dictionary where each key is an ambiguous key and each value the names it could mean
+        rows, unmatched, ambiguous = [], [], {}
+        for key in keys:
+            row = self.find(key)
+            names = self.findAmbiguous(key) if row is not None else None
+            if row is None: unmatched.append(key)
+            if names is not None: ambiguous[key] = names
+            rows.append(-1 if row is None or names is not None else row)
+        return rows, unmatched, ambiguous
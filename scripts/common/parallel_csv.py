@@ -0,0 +1,55 @@
+# Parsing of very large .csv files (in the format of data.csv) with a pool of processes.
+# The file is split into chunks of bytes ending on row boundaries, every process parses its chunks
+# into partial arrays (names, codes, values, mask) with the same code as the serial parseCsv,
+# and the chunks are joined in the order of rows, so the result is identical to PopulationDataset(file_name).
+#   dataset = readCsvParallel('country_data.csv', processes=8)
+import locale
+import multiprocessing
+import os
+import numpy as np
+from common.population_dataset import PopulationDataset, parseRows
+
+
+def chunkBoundaries(file_name, data_start, chunk_bytes):
+    # Byte offsets of the chunks: every chunk starts at the beginning of a row
+    size = os.path.getsize(file_name)
+    boundaries = [data_start]
+    with open(file_name, 'rb') as file:
+        while boundaries[-1] < size:
+            file.seek(min(boundaries[-1] + chunk_bytes, size))
+            file.readline() # moves to the end of the row the chunk ends in
+            boundaries.append(min(file.tell(), size))
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parseChunk(arguments):
+    file_name, start, stop, year_count = arguments
+    with open(file_name, 'rb') as file:
+        file.seek(start)
+        text = file.read(stop - start).decode(locale.getpreferredencoding(False))
+    # the same new lines as in a file opened in text mode
+    rows = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return parseRows(rows, year_count)
+
+
+def readCsvParallel(file_name, processes=None, chunk_bytes=None):
+    # PopulationDataset of the file parsed by processes (all cores if None).
+    # chunk_bytes - size of the chunks, by default the file is split into 4 chunks per process.
+    processes = processes or os.cpu_count()
+    with open(file_name, 'rb') as file:
+        header = file.readline()
+    titles = [i[1:] for i in header.decode(locale.getpreferredencoding(False)).rstrip('\r\n').split('",')[:-1]]
+    year_count = len(titles) - 4
+    chunk_bytes = chunk_bytes or max(os.path.getsize(file_name)//(processes*4), 1 << 20)
+    chunks = [(file_name, start, stop, year_count) for start, stop in chunkBoundaries(file_name, len(header), chunk_bytes)]
+    if processes == 1 or len(chunks) <= 1:
+        parts = [parseChunk(i) for i in chunks]
+    else:
+        with multiprocessing.Pool(min(processes, len(chunks))) as pool:
+            parts = pool.map(parseChunk, chunks)
+    dataset = PopulationDataset()
+    dataset.file_name = file_name
+    if not parts: parts = [([], [], np.zeros((0, year_count), dtype=np.int64), np.zeros((0, year_count), dtype=bool))]
+    dataset.setArrays([i for part in parts for i in part[0]], [i for part in parts for i in part[1]], titles[4:],
+        np.concatenate([part[2] for part in parts]), np.concatenate([part[3] for part in parts]))
+    return dataset
@@ -0,0 +1,329 @@
+# Population data from the manualy corrected World Bank .csv file kept in numpy arrays instead of
+# dictionaries of lists, so selections over all countries can be done with array operations.
+# The file is parsed the same way as readCsv in the generator scripts.
+import warnings
+import numpy as np
+from common.name_index import NameIndex
+from common.year_axis import YearAxis
+
+
+def parseCsv(file_name):
+    # Returns (names, codes, years, values, mask) of the .csv file in the format of data.csv
+    with open(file_name) as data_file:
+        rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
+    titles = [i[1:] for i in rows[0].split('",')[:-1]]
+    names, codes, values, mask = parseRows(rows[1:], len(titles) - 4)
+    return names, codes, titles[4:], values, mask
+
+
+def parseRows(rows, year_count):
+    # Returns (names, codes, values, mask) of the data rows (lines without the header)
+    names, codes, cells = [], [], []
+    for row in rows:
+        country_data = row.split('",')[:-1]
+        if not country_data: continue
+        names.append(country_data[0][1:])
+        codes.append(country_data[1][1:])
+        cells.append([i[1:] for i in country_data[4:]])
+    cells = np.array(cells, dtype=str).reshape(len(names), year_count)
+    mask = cells != ''
+    return names, codes, np.where(mask, cells, '0').astype(np.int64), mask
+
+
+def rankColumns(values, mask):
+    # Rank of every row in every column, 0 - the largest value, -1 where the value is unknown
+    keys = np.where(mask, values, values.min(initial=0) - 1)
+    order = np.argsort(-keys, axis=0, kind='stable')
+    ranks = np.empty(values.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.arange(len(values))[:, None], axis=0)
+    ranks[~mask] = -1
+    return ranks
+
+
+def knownRange(mask):
+    # (first, last) known column of every row, -1 where nothing is known
+    if not mask.shape[1]: return np.full(len(mask), -1, dtype=np.int64), np.full(len(mask), -1, dtype=np.int64)
+    known = mask.any(axis=1)
+    first = np.where(known, np.argmax(mask, axis=1), -1)
+    last = np.where(known, mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1), -1)
+    return first, last
+
+
+def insertRanks(ranks, values, mask, added_values, added_mask):
+    # Ranks of one column after rows (added_values, added_mask) are added after the stored ones.
+    # Returns (ranks of the stored rows, ranks of the added rows). Stored known values are ordered
+    # from their ranks in O(n) instead of sorting the column again, only the added values are sorted.
+    # Equal values keep the order of rows (stored rows first), like in rankColumns.
+    ordered = np.empty(mask.sum(), dtype=values.dtype)
+    ordered[ranks[mask]] = values[mask] # stored known values from the largest
+    added = np.sort(added_values[added_mask])
+    stored_ranks = ranks.copy()
+    # stored rows move down by the number of added values larger than theirs
+    stored_ranks[mask] += len(added) - np.searchsorted(added, values[mask], side='right')
+    # added rows go after all stored values larger or equal to theirs and before them among the added ones
+    added_ranks = np.full(len(added_values), -1, dtype=np.int64)
+    added_order = np.flatnonzero(added_mask)[np.argsort(-added_values[added_mask], kind='stable')]
+    added_ranks[added_order] = np.arange(len(added_order)) + len(ordered) - \
+        np.searchsorted(ordered[::-1], added_values[added_order], side='left')
+    return stored_ranks, added_ranks
+
+
+class PopulationDataset:
+    def __init__(self, file_name=None):
+        self.file_name = file_name
+        self.names = np.array([], dtype=str) # country names, one per row of values
+        self.codes = np.array([], dtype=str) # country codes, one per row of values
+        self.years = YearAxis([]) # years of the columns of values
+        self.values = np.zeros((0, 0), dtype=np.int64) # population sizes, rows - countries, columns - years
+        self.mask = np.zeros((0, 0), dtype=bool) # True where population size is known
+        self.row_indexes = {} # key-country name, value-row of values
+        self.name_index = None # normalized names and codes, used to join other tables
+        self.sizes = None # country sizes in sq.km, one per row of values (nan where unknown)
+        self.density = None # array years x countries, population per sq.km (nan where unknown)
+        self.groupings = {} # key-grouping name, value-dictionary with group names and (row, group) pairs
+        self.rollups = {} # key-grouping name, value-dictionary with group totals for all years
+        self.cache_path = None # directory of the cache (see dataset_cache.py) rollups are saved to
+        self.shared_memory = None # shared memory blocks the arrays point to (see shared_dataset.py)
+        self.ranks = None # rank of every country in every year (0 - the most populated, -1 where unknown)
+        self.known_counts = None # number of countries with known population in every year
+        self.first_known = None # first known column of every country (-1 if nothing is known)
+        self.last_known = None # last known column of every country (-1 if nothing is known)
+        if file_name: self.readCsv()
+
+    @classmethod
+    def fromArrays(cls, names, codes, years, values, mask):
+        dataset = cls()
+        dataset.setArrays(names, codes, years, values, mask)
+        return dataset
+
+    def setArrays(self, names, codes, years, values, mask):
+        self.names = np.asarray(names, dtype=str)
+        self.codes = np.asarray(codes, dtype=str)
+        self.years = years if isinstance(years, YearAxis) else YearAxis(years)
+        values = np.asarray(values)
+        # population sizes are integers, derived metrics (see growth_analytics.py) stay floats
+        self.values = values if np.issubdtype(values.dtype, np.floating) else values.astype(np.int64, copy=False)
+        self.mask = np.asarray(mask, dtype=bool)
+        self.row_indexes = {name: index for index, name in enumerate(self.names.tolist())}
+        self.name_index = NameIndex(self.names, self.codes)
+
+    def readCsv(self):
+        self.setArrays(*parseCsv(self.file_name))
+
+    def buildIndexes(self):
+        # Rank of every country in every year and validity of the data (known values per year,
+        # first and last known year of every country). appendData keeps them up to date.
+        self.ranks = rankColumns(self.values, self.mask)
+        self.known_counts = self.mask.sum(axis=0)
+        self.first_known, self.last_known = knownRange(self.mask)
+
+    def appendCsv(self, file_name):
+        # Adds data of the .csv file with new years and/or new countries (see appendData)
+        return self.appendData(*parseCsv(file_name))
+
+    def appendData(self, names, codes, years, values, mask):
+        # Adds year columns and countries without parsing the stored data again.
+        # names, codes, years - of the added data, values and mask - arrays len(names) x len(years).
+        # Years after the last stored year become new columns, countries not stored yet become new rows.
+        # Stored values can't be changed this way, ValueError if the added data differs from them.
+        # Everything is checked before the dataset is changed, so a rejected append leaves it as it was.
+        # Indexes, rollups and density are updated only for the added rows and columns.
+        # Returns (added_rows, added_columns) as slices.
+        values, mask = np.asarray(values, dtype=self.values.dtype), np.asarray(mask, dtype=bool)
+        row_count, column_count = self.values.shape
+        years = np.array([int(i) for i in years], dtype=np.int64)
+        new_years = years[~np.isin(years, self.years.values)]
+        grown_years = YearAxis(self.years.values)
+        grown_years.append(new_years) # ValueError before anything is changed
+        columns = grown_years.indexes(years)
+        rows = np.array([self.row_indexes.get(str(i), -1) for i in names], dtype=np.int64)
+        added = rows < 0
+        rows[added] = row_count + np.arange(added.sum())
+        stored = np.ix_(rows[~added], columns[columns < column_count])
+        part = np.ix_(np.flatnonzero(~added), np.flatnonzero(columns < column_count))
+        changed = mask[part] & (~self.mask[stored] | (values[part] != self.values[stored]))
+        if changed.any():
+            raise ValueError(f'{changed.sum()} stored values differ from the appended ones, read the whole file again')
+        self.years.append(new_years)
+        names, codes = np.asarray(names, dtype=str)[added], np.asarray(codes, dtype=str)[added]
+        self.names, self.codes = np.concatenate([self.names, names]), np.concatenate([self.codes, codes])
+        self.row_indexes.update({name: index for index, name in enumerate(names.tolist(), row_count)})
+        self.name_index.add(names, codes)
+
+        shape = (len(self.names), len(self.years))
+        grown_values, grown_mask = np.zeros(shape, dtype=self.values.dtype), np.zeros(shape, dtype=bool)
+        grown_values[:row_count, :column_count], grown_mask[:row_count, :column_count] = self.values, self.mask
+        target = np.ix_(rows, columns)
+        grown_values[target] = np.where(mask, values, grown_values[target])
+        grown_mask[target] |= mask
+        self.values, self.mask = grown_values, grown_mask
+        added_rows, added_columns = slice(row_count, shape[0]), slice(column_count, shape[1])
+        if self.ranks is not None: self.updateIndexes(added_rows, added_columns)
+        for name in self.rollups: self.extendRollup(name, added_columns)
+        if self.sizes is not None:
+            self.sizes = np.concatenate([self.sizes, np.full(shape[0] - row_count, np.nan)])
+            # the stored block can't change, density is computed only for the added rows and columns
+            density = np.full(shape[::-1], np.nan)
+            density[:column_count, :row_count] = self.density
+            for part in (np.s_[:, added_rows], np.s_[added_columns, :row_count]):
+                density[part] = np.where(self.mask.T[part], self.values.T[part]/self.sizes[None, part[1]], np.nan)
+            self.density = density
+        return added_rows, added_columns
+
+    def updateIndexes(self, added_rows, added_columns):
+        # Ranks of the added columns are computed, ranks of the stored columns are only shifted by
+        # the added countries which are known in them (insertRanks)
+        ranks = np.full(self.values.shape, -1, dtype=np.int64)
+        ranks[:added_rows.start, :added_columns.start] = self.ranks
+        ranks[:, added_columns] = rankColumns(self.values[:, added_columns], self.mask[:, added_columns])
+        for column in np.flatnonzero(self.mask[added_rows, :added_columns.start].any(axis=0)):
+            ranks[:added_rows.start, column], ranks[added_rows, column] = insertRanks(
+                ranks[:added_rows.start, column], self.values[:added_rows.start, column],
+                self.mask[:added_rows.start, column], self.values[added_rows, column], self.mask[added_rows, column])
+        self.ranks = ranks
+        self.known_counts = np.concatenate([self.known_counts + self.mask[added_rows, :added_columns.start].sum(axis=0),
+            self.mask[:, added_columns].sum(axis=0)])
+        first_known, last_known = knownRange(self.mask[:added_rows.start, added_columns])
+        shifted = first_known >= 0
+        first_known[shifted] += added_columns.start
+        last_known[shifted] += added_columns.start
+        self.first_known = np.where(self.first_known >= 0, self.first_known, first_known)
+        self.last_known = np.where(last_known >= 0, last_known, self.last_known)
+        first_known, last_known = knownRange(self.mask[added_rows])
+        self.first_known = np.concatenate([self.first_known, first_known])
+        self.last_known = np.concatenate([self.last_known, last_known])
+
+    def writeCsv(self, file_name, scale=1, indicator_name='Population, total', indicator_code='SP.POP.TOTL'):
+        # Writes the data in the format of data.csv, so it can be used as file_name of the generators.
+        # Values are written as integers, float metrics should be multiplied by scale to keep their precision.
+        cells = np.where(self.mask, np.rint(self.values*scale).astype(np.int64).astype(str), '')
+        header = ['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'] + self.years.labels()
+        with open(file_name, 'w') as file:
+            file.write(''.join(f'"{i}",' for i in header))
+            file.write(''.join(f'\n"{name}","{code}","{indicator_name}","{indicator_code}",' +
+                ''.join(f'"{i}",' for i in row) for name, code, row in zip(self.names, self.codes, cells)))
+
+    def joinTable(self, file_name, separator=';', strict=True):
+        # Reads table with lines "name_or_code;value" and returns its values as a float array aligned
+        # with rows (nan for countries missing in the table). Keys are matched through the normalized
+        # name index. With strict=True keys that match no country or several countries (names of the data
+        # which normalize to the same key) raise ValueError listing all of them, so a mismatch is reported
+        # before anything is plotted. Otherwise ambiguous keys are left out of the join with a warning.
+        joined = np.full(len(self.names), np.nan)
+        keys, values = [], []
+        with open(file_name) as file:
+            for line in file.read().split('\n'):
+                if not line.strip(): continue
+                key, value = line.split(separator)
+                keys.append(key)
+                values.append(float(value))
+        rows, unmatched, ambiguous = self.name_index.join(keys)
+        if unmatched and strict:
+            raise ValueError(f'{len(unmatched)} keys of {file_name} match no country: {unmatched}')
+        if ambiguous:
+            message = f'{len(ambiguous)} keys of {file_name} match several countries and are not joined: {ambiguous}'
+            if strict: raise ValueError(message)
+            warnings.warn(message)
+        rows = np.array(rows, dtype=np.int64)
+        joined[rows[rows >= 0]] = np.array(values)[rows >= 0]
+        return joined
+
+    def readCountrySizeCSV(self, file_name, strict=True):
+        # Joins country sizes (lines "name;size") to rows of values once
+        # and computes the density array for all years and countries
+        self.sizes = self.joinTable(file_name, ';', strict)
+        self.density = np.where(self.mask, self.values/self.sizes[:, None], np.nan).T
+
+    def densityExtrema(self, rows=None):
+        # (min, max) density over all years of the given rows (all countries if rows is None)
+        density = self.density if rows is None else self.density[:, rows]
+        return float(np.nanmin(density)), float(np.nanmax(density))
+
+    def addGrouping(self, name, groups):
+        # Declares grouping of countries (regions, income levels, custom lists).
+        # groups - dictionary where each key is a group name and each value a list of country names or codes,
+        # a country may belong to several groups. Rollup computed before for a different grouping is dropped.
+        rows, group_ids, unmatched, ambiguous = [], [], [], {}
+        for group_id, group in enumerate(groups):
+            found, missing, several = self.name_index.join(groups[group])
+            unmatched.extend(missing)
+            ambiguous.update(several)
+            found = [i for i in found if i >= 0]
+            rows.extend(found)
+            group_ids.extend([group_id]*len(found))
+        if unmatched: raise ValueError(f'{len(unmatched)} countries of grouping {name} not found: {unmatched}')
+        if ambiguous: raise ValueError(f'{len(ambiguous)} countries of grouping {name} match several countries: {ambiguous}')
+        grouping = {'groups': list(groups), 'rows': np.array(rows, dtype=np.int64),
+            'group_ids': np.array(group_ids, dtype=np.int64)}
+        previous = self.groupings.get(name)
+        if previous is None or previous['groups'] != grouping['groups'] or \
+                not np.array_equal(previous['rows'], grouping['rows']) or \
+                not np.array_equal(previous['group_ids'], grouping['group_ids']):
+            self.groupings[name] = grouping
+            self.rollups.pop(name, None)
+
+    def readGroupingCSV(self, name, file_name, separator=';'):
+        # Declares grouping from a file with lines "country;group"
+        groups = {}
+        with open(file_name) as file:
+            for line in file.read().split('\n'):
+                if not line.strip(): continue
+                country, group = line.split(separator)
+                groups.setdefault(group, []).append(country)
+        self.addGrouping(name, groups)
+
+    def rollup(self, name):
+        # Totals of all groups of the grouping for all years, computed once with a single vectorized
+        # group-by over the population matrix and kept (also in the cache, if the dataset has one).
+        # Returns dictionary with group names, totals (groups x years) and complete - True where all
+        # members of the group have known population in that year.
+        if name not in self.rollups:
+            totals, complete = self.groupTotals(name, slice(None))
+            self.rollups[name] = {'groups': self.groupings[name]['groups'], 'totals': totals, 'complete': complete}
+            if self.cache_path:
+                from common.dataset_cache import saveGrouping
+                saveGrouping(self, self.cache_path, name)
+        return self.rollups[name]
+
+    def groupTotals(self, name, columns):
+        # (totals, complete) of the groups of the grouping in the given columns
+        grouping = self.groupings[name]
+        group_count, group_ids = len(grouping['groups']), grouping['group_ids']
+        values, mask = self.values[:, columns], self.mask[:, columns]
+        totals = np.zeros((group_count, values.shape[1]), dtype=self.values.dtype)
+        known = np.zeros((group_count, values.shape[1]), dtype=np.int64)
+        np.add.at(totals, group_ids, np.where(mask, values, 0)[grouping['rows']])
+        np.add.at(known, group_ids, mask[grouping['rows']])
+        members = np.bincount(group_ids, minlength=group_count)
+        return totals, known == members[:, None]
+
+    def extendRollup(self, name, added_columns):
+        # Rollup of the added columns only, joined to the stored one (added countries belong to no group)
+        totals, complete = self.groupTotals(name, added_columns)
+        rollup = self.rollups[name]
+        rollup['totals'] = np.concatenate([rollup['totals'], totals], axis=1)
+        rollup['complete'] = np.concatenate([rollup['complete'], complete], axis=1)
+
+    def rollupDataset(self, name):
+        # Group totals as a dataset (one row per group), so the generators can chart them like countries
+        rollup = self.rollup(name)
+        return PopulationDataset.fromArrays(rollup['groups'], rollup['groups'], self.years.values,
+            rollup['totals'], rollup['totals'] > 0)
+
+    def extractDataFromYear(self, year):
+        # Returns dicitonary with data from the indicated year, sorted from the most populated country.
+        # Each key is a country name and each value its population size.
+        column = self.years.index(year)
+        known = np.flatnonzero(self.mask[:, column] & (self.values[:, column] > 0))
+        order = known[np.argsort(-self.values[known, column], kind='stable')]
+        return dict(zip(self.names[order].tolist(), self.values[order, column].tolist()))
+
+    def rows(self, country_names):
+        # Row indexes of the given countries as an array
+        return np.array([self.row_indexes[i] for i in country_names], dtype=np.int64)
+
+    def asCountries(self):
+        # Data in the format used by the generator scripts: dictionary where each key is a country name
+        # and each value is a list of population sizes year by year (None where unknown)
+        return {str(name): [int(value) if known else None for value, known in zip(self.values[index], self.mask[index])]
+            for index, name in enumerate(self.names)}
@@ -0,0 +1,84 @@
+# Population data published once in shared memory and attached by worker processes without copying,
+# instead of every worker parsing the .csv file again or receiving a pickled copy of the data:
+#   with SharedDataset(dataset) as shared:
+#       results = shared.map(function, items, processes=32) # function(dataset, item) in the workers
+# Workers get only shared.description (names of the memory blocks, shapes and dtypes), the arrays
+# (values, mask, years, names and codes) are numpy views of the shared memory, read-only.
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from common.population_dataset import PopulationDataset
+
+ARRAYS = ('values', 'mask', 'names', 'codes', 'years')
+
+worker_dataset = None # dataset attached by initWorker in a worker process
+
+
+def openMemory(name):
+    # Attaches existing shared memory without registering it for removal at exit, the process which
+    # created it removes it. Before Python 3.13 there is no track=False, so registration is skipped
+    # by hand: unregistering afterwards would also drop the registration of the owner, because pool
+    # workers share the resource tracker of the process which started them.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try: return shared_memory.SharedMemory(name=name)
+        finally: resource_tracker.register = register
+
+
+def attachDataset(description):
+    # PopulationDataset with arrays pointing to the shared memory of the description
+    blocks, arrays = [], {}
+    for name in ARRAYS:
+        entry = description[name]
+        block = openMemory(entry['memory'])
+        blocks.append(block)
+        array = np.ndarray(entry['shape'], dtype=np.dtype(entry['dtype']), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    dataset = PopulationDataset.fromArrays(arrays['names'], arrays['codes'], arrays['years'], arrays['values'], arrays['mask'])
+    dataset.file_name = description['file_name']
+    dataset.shared_memory = blocks # kept with the dataset, so the memory stays mapped while it is used
+    return dataset
+
+
+def initWorker(description):
+    global worker_dataset
+    worker_dataset = attachDataset(description)
+
+
+def callWithDataset(arguments):
+    function, item = arguments
+    return function(worker_dataset, item)
+
+
+class SharedDataset:
+    def __init__(self, dataset):
+        self.blocks = [] # shared memory created by this process, removed by close
+        self.description = {'file_name': dataset.file_name}
+        for name in ARRAYS:
+            array = np.ascontiguousarray(dataset.years.values if name == 'years' else getattr(dataset, name))
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.description[name] = {'memory': block.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+    def map(self, function, items, processes=None, chunk_size=1):
+        # Results of function(dataset, item) for all items computed by a pool of processes which attach
+        # the dataset once. function must be defined at the top level of a module (it is pickled).
+        with multiprocessing.Pool(processes, initializer=initWorker, initargs=(self.description,)) as pool:
+            return pool.map(callWithDataset, [(function, i) for i in items], chunk_size)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
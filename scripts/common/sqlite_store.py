@@ -0,0 +1,111 @@
+# Optional SQLite store of the population data in long format (one row per indicator, country and year),
+# so several processes can share one file on disk and read only the rows they need:
+#   countries(id, name, code), indicators(id, name, code), data(indicator_id, country_id, year, value)
+# Indexes on data:
+#   (indicator_id, year, value)  - countries of one year sorted by population, nearest population sizes
+#   (country_id, year)           - series of the chosen countries
+# Readers open the file with read_only=True, the database uses WAL mode so they don't block a writer.
+import os
+import sqlite3
+import numpy as np
+from common.population_dataset import PopulationDataset
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS countries (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, code TEXT);
+CREATE TABLE IF NOT EXISTS indicators (id INTEGER PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT);
+CREATE TABLE IF NOT EXISTS data (indicator_id INTEGER NOT NULL, country_id INTEGER NOT NULL,
+    year INTEGER NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (indicator_id, country_id, year)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS data_indicator_year_value ON data (indicator_id, year, value);
+CREATE INDEX IF NOT EXISTS data_country_year ON data (country_id, year);
+'''
+
+
+class SqliteStore:
+    def __init__(self, db_file, read_only=False):
+        self.db_file = db_file
+        if read_only:
+            self.connection = sqlite3.connect(f'file:{os.path.abspath(db_file)}?mode=ro', uri=True)
+        else:
+            self.connection = sqlite3.connect(db_file)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def indicatorId(self, indicator_code):
+        row = self.connection.execute('SELECT id FROM indicators WHERE code = ?', (indicator_code,)).fetchone()
+        if row is None: raise ValueError(f'There is no indicator {indicator_code} in {self.db_file}')
+        return row[0]
+
+    def importDataset(self, dataset, indicator_code='SP.POP.TOTL', indicator_name='Population, total'):
+        # Writes known values of the dataset as the given indicator, replacing its previous values
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO indicators (code, name) VALUES (?, ?)', (indicator_code, indicator_name))
+            indicator_id = self.indicatorId(indicator_code)
+            self.connection.executemany('INSERT INTO countries (name, code) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET code = excluded.code',
+                zip(dataset.names.tolist(), dataset.codes.tolist()))
+            country_ids = dict(self.connection.execute('SELECT name, id FROM countries'))
+            ids = np.array([country_ids[i] for i in dataset.names.tolist()], dtype=np.int64)
+            rows, columns = np.nonzero(dataset.mask)
+            self.connection.execute('DELETE FROM data WHERE indicator_id = ?', (indicator_id,))
+            self.connection.executemany('INSERT INTO data VALUES (?, ?, ?, ?)', zip([indicator_id]*len(rows),
+                ids[rows].tolist(), dataset.years.values[columns].tolist(), dataset.values[rows, columns].tolist()))
+        self.connection.execute('ANALYZE')
+
+    def importCsv(self, file_name, indicator_code='SP.POP.TOTL', indicator_name='Population, total'):
+        self.importDataset(PopulationDataset(file_name), indicator_code, indicator_name)
+
+    def years(self, indicator_code='SP.POP.TOTL'):
+        return [i[0] for i in self.connection.execute('SELECT DISTINCT year FROM data WHERE indicator_id = ? ORDER BY year',
+            (self.indicatorId(indicator_code),))]
+
+    def extractDataFromYear(self, year, indicator_code='SP.POP.TOTL', limit=None):
+        # Returns dicitonary with data from the indicated year, sorted from the most populated country.
+        # Each key is a country name and each value its population size. limit - only the first countries.
+        query = ('SELECT countries.name, data.value FROM data JOIN countries ON countries.id = data.country_id '
+            'WHERE data.indicator_id = ? AND data.year = ? AND data.value > 0 ORDER BY data.value DESC')
+        parameters = (self.indicatorId(indicator_code), int(year))
+        if limit is not None: query, parameters = query + ' LIMIT ?', parameters + (limit,)
+        return dict(self.connection.execute(query, parameters))
+
+    def nearestPopulation(self, year, population, k=5, indicator_code='SP.POP.TOTL'):
+        # k countries with population closest to the given one in the year, as list of tuples (name, population).
+        # Two range scans of the (indicator, year, value) index: k sizes above and k below the population.
+        indicator_id = self.indicatorId(indicator_code)
+        query = ('SELECT countries.name, data.value FROM data JOIN countries ON countries.id = data.country_id '
+            'WHERE data.indicator_id = ? AND data.year = ? AND data.value {} ? ORDER BY data.value {} LIMIT ?')
+        above = self.connection.execute(query.format('>=', 'ASC'), (indicator_id, int(year), population, k)).fetchall()
+        below = self.connection.execute(query.format('<', 'DESC'), (indicator_id, int(year), population, k)).fetchall()
+        return sorted(above + below, key=lambda x: abs(x[1] - population))[:k]
+
+    def series(self, country_names, indicator_code='SP.POP.TOTL'):
+        # Dictionary where each key is a country name and each value a dictionary {year: population}
+        indicator_id = self.indicatorId(indicator_code)
+        series = {}
+        for name in country_names:
+            rows = self.connection.execute('SELECT data.year, data.value FROM countries JOIN data ON data.country_id = countries.id '
+                'WHERE countries.name = ? AND data.indicator_id = ? ORDER BY data.year', (name, indicator_id))
+            series[name] = dict(rows)
+        return series
+
+    def toDataset(self, country_names=None, indicator_code='SP.POP.TOTL'):
+        # PopulationDataset of the given countries only (all countries if None)
+        if country_names is None:
+            country_names = [i[0] for i in self.connection.execute('SELECT name FROM countries ORDER BY id')]
+        codes = dict(self.connection.execute('SELECT name, code FROM countries'))
+        years = self.years(indicator_code)
+        columns = {year: index for index, year in enumerate(years)}
+        values = np.zeros((len(country_names), len(years)), dtype=np.int64)
+        mask = np.zeros(values.shape, dtype=bool)
+        for row, data in enumerate(self.series(country_names, indicator_code).values()):
+            indexes = [columns[i] for i in data]
+            values[row, indexes] = list(data.values())
+            mask[row, indexes] = True
+        return PopulationDataset.fromArrays(country_names, [codes[i] for i in country_names], years, values, mask)
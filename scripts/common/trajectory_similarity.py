@@ -0,0 +1,104 @@
+# Selection of countries by similarity of their whole population trajectories (all years),
+# instead of population size in one drawn year like getRandomYear does.
+# Distances between all pairs of series are computed with matrix products over blocks of rows,
+# so tens of thousands of series never need a Python double loop, and missing values are handled
+# by comparing every pair only over years known for both countries. Every year is centered on the mean
+# of its known values first, and pairs of nearly equal series, where the difference of the sums of the
+# matrix products cancels, are summed again from the differences of their values.
+# Metrics:
+#   euclidean   - root mean square difference of population sizes
+#   log         - the same on log(population), compares relative rather than absolute sizes
+#   correlation - 1 - Pearson correlation of the series over their common years (shape of the
+#                 trajectory, not its level). Means and variances of every pair are taken over the
+#                 common years from sums built as masked matrix products (count, sums, sums of squares
+#                 and of products), pairs constant over their common years get infinite distance.
+import numpy as np
+
+METRICS = ('euclidean', 'log', 'correlation')
+
+
+def prepareSeries(values, mask, metric):
+    # Returns (series, weights): float arrays with zeros where values are missing and mask as 0/1 weights
+    if metric not in METRICS: raise ValueError(f'Unknown metric: {metric}, use one of {METRICS}')
+    mask = mask & (values > 0) if metric == 'log' else mask.copy()
+    weights = mask.astype(np.float64)
+    series = np.where(mask, values, 0).astype(np.float64)
+    if metric == 'log':
+        series = np.log(np.where(mask, series, 1.0))*weights
+    elif metric == 'correlation':
+        # standardize every series over its known years, it doesn't change the correlation of any pair
+        # but keeps the sums of squares of distanceBlock small (no cancellation of huge numbers)
+        counts = np.maximum(weights.sum(axis=1, keepdims=True), 1)
+        means = series.sum(axis=1, keepdims=True)/counts
+        deviations = (series - means)*weights
+        deviations /= np.sqrt((deviations**2).sum(axis=1, keepdims=True)/counts) + 1e-12
+        series = deviations
+    else:
+        # differences of series don't change, but sums of squares get smaller
+        counts = np.maximum(weights.sum(axis=0), 1)
+        series = (series - series.sum(axis=0)/counts)*weights
+    return series, weights
+
+
+def distanceBlock(series, weights, rows, metric, min_overlap=2):
+    # Distances between series[rows] and all series (array len(rows) x len(series)).
+    # Pairs with less than min_overlap common known years get infinite distance.
+    block_series, block_weights = series[rows], weights[rows]
+    overlap = block_weights @ weights.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'correlation':
+            # sums over common years of x, y, x^2, y^2 and x*y, missing values are zeros of series
+            sum_x, sum_y = block_series @ weights.T, block_weights @ series.T
+            variance_x = (block_series**2) @ weights.T - sum_x**2/overlap
+            variance_y = block_weights @ (series**2).T - sum_y**2/overlap
+            covariance = block_series @ series.T - sum_x*sum_y/overlap
+            flat = (variance_x <= 1e-9*overlap) | (variance_y <= 1e-9*overlap)
+            distances = 1 - covariance/np.sqrt(np.maximum(variance_x*variance_y, 0))
+            distances[flat] = np.inf
+        else:
+            # sum over common years of (a-b)^2 = a^2*m_b + m_a*b^2 - 2*a*b, written as three matrix products
+            squares = (block_series**2) @ weights.T + block_weights @ (series**2).T
+            squared = squares - 2*(block_series @ series.T)
+            inexact = np.argwhere((squared <= 1e-6*squares) & (squares > 0))
+            for start in range(0, len(inexact), 65536):
+                i, j = inexact[start:start + 65536].T
+                differences = (block_series[i] - series[j])*block_weights[i]*weights[j]
+                squared[i, j] = (differences**2).sum(axis=1)
+            distances = np.sqrt(np.maximum(squared, 0)/overlap)
+    distances[overlap < min_overlap] = np.inf
+    return distances
+
+
+def closestTrajectories(dataset, target_name, k, metric='log'):
+    # Returns list of k tuples (country_name, distance) most similar to target_name
+    if k < 1: raise ValueError(f'k must be at least 1, got {k}')
+    series, weights = prepareSeries(dataset.values, dataset.mask, metric)
+    target = dataset.row_indexes[target_name]
+    distances = distanceBlock(series, weights, np.array([target]), metric)[0]
+    distances[target] = np.inf
+    k = min(k, len(distances) - 1)
+    closest = np.argpartition(distances, k-1)[:k]
+    closest = closest[np.argsort(distances[closest], kind='stable')]
+    return [(str(dataset.names[i]), float(distances[i])) for i in closest]
+
+
+def allClosestTrajectories(dataset, k, metric='log', block_size=1024):
+    # k most similar series for every series of the dataset. Distances are computed block by block
+    # (block_size rows x all series), so memory stays at block_size*len(series) values.
+    # Returns (indexes, distances), both arrays len(series) x k, sorted from the closest.
+    if k < 1: raise ValueError(f'k must be at least 1, got {k}')
+    series, weights = prepareSeries(dataset.values, dataset.mask, metric)
+    count = len(series)
+    k = min(k, count - 1)
+    indexes = np.zeros((count, k), dtype=np.int64)
+    distances = np.zeros((count, k))
+    for start in range(0, count, block_size):
+        rows = np.arange(start, min(start + block_size, count))
+        block = distanceBlock(series, weights, rows, metric)
+        block[np.arange(len(rows)), rows] = np.inf # a series is not its own neighbour
+        closest = np.argpartition(block, k-1, axis=1)[:, :k]
+        closest_distances = np.take_along_axis(block, closest, axis=1)
+        order = np.argsort(closest_distances, axis=1, kind='stable')
+        indexes[rows] = np.take_along_axis(closest, order, axis=1)
+        distances[rows] = np.take_along_axis(closest_distances, order, axis=1)
+    return indexes, distances
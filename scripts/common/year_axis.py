@@ -0,0 +1,69 @@
+# Year axis of the population data stored as an integer array. Column of a year is found with
+# an offset from the first year (constant time) instead of list.index on year strings,
+# and year ranges are selected with slices in years:
+#   years.index(1990)   -> column of 1990
+#   years[1990:1996]    -> array of columns of 1990-1995 (the end is excluded like in every slice)
+#   years[1960::10]     -> columns of every 10th year from 1960
+# Indexing is always by year; positions are available in years.values.
+# Axes with gaps (or monthly/daily points stored as integers) fall back to a dictionary lookup.
+import numpy as np
+
+
+class YearAxis:
+    def __init__(self, years):
+        self.values = np.array([int(i) for i in years], dtype=np.int64)
+        self.first = int(self.values[0]) if len(self.values) else 0
+        self.contiguous = bool((np.diff(self.values) == 1).all())
+        self.positions = None if self.contiguous else {int(year): index for index, year in enumerate(self.values)}
+
+    def append(self, years):
+        # Adds years after the last one (new columns of the data)
+        years = np.array([int(i) for i in years], dtype=np.int64)
+        if not len(years): return
+        if len(self.values) and years[0] <= self.values[-1] or (np.diff(years) <= 0).any():
+            raise ValueError(f'years {years.tolist()} are not increasing years after the last year of the axis')
+        if not len(self.values): self.first = int(years[0])
+        self.values = np.concatenate([self.values, years])
+        self.contiguous = bool((np.diff(self.values) == 1).all())
+        self.positions = None if self.contiguous else {int(year): index for index, year in enumerate(self.values)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    def index(self, year):
+        # Column of the given year (int or str), ValueError if there is no such year
+        year = int(year)
+        if self.contiguous:
+            index = year - self.first
+            if 0 <= index < len(self.values): return index
+        elif year in self.positions:
+            return self.positions[year]
+        raise ValueError(f'{year} is not in the year axis')
+
+    def indexes(self, years):
+        # Columns of many years at once as an array
+        years = np.asarray(years, dtype=np.int64)
+        if self.contiguous:
+            indexes = years - self.first
+            if ((indexes < 0) | (indexes >= len(self.values))).any(): raise ValueError('year out of the year axis')
+            return indexes
+        return np.array([self.index(i) for i in years], dtype=np.int64)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice): return self.index(key)
+        if not len(self.values): return np.array([], dtype=np.int64) # no columns to select
+        start = self.values[0] if key.start is None else int(key.start)
+        stop = self.values[-1] + 1 if key.stop is None else int(key.stop)
+        step = key.step or 1
+        wanted = np.arange(start, stop, step)
+        if self.contiguous:
+            return wanted[(wanted >= self.values[0]) & (wanted <= self.values[-1])] - self.first
+        return np.flatnonzero(np.isin(self.values, wanted))
+
+    def labels(self, indexes=None):
+        # Years as strings (for titles and year counters), all or only of the given columns
+        values = self.values if indexes is None else self.values[indexes]
+        return [str(i) for i in values]
@@ -0,0 +1,46 @@
+# This script writes existing animations again with DeltaGifEncoder (see common/delta_gif.py):
+# GIF files (e.g. plots/*.gif) or directories of .png frames made by lab 1 scripts (task_a_images/).
+# Frames of a directory are taken in the order of their names (years). A GIF file which does not get
+# smaller (e.g. its frames were already quantized with different palettes) is copied unchanged.
+# Usage:
+#   python optimize_gifs.py ../../plots/*.gif --output-dir optimized
+#   python optimize_gifs.py task_a_images --output-dir optimized --duration 150
+import argparse
+import os
+import shutil
+import sys
+import time
+from PIL import Image, ImageSequence
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.delta_gif import DeltaGifEncoder
+
+
+def readFrames(path, duration):
+    # (frame, duration) pairs of a GIF file or a directory of .png files
+    if os.path.isdir(path):
+        for name in sorted(i for i in os.listdir(path) if i.lower().endswith('.png')):
+            with Image.open(os.path.join(path, name)) as image: yield image.convert('RGB'), duration
+        return
+    with Image.open(path) as image:
+        for frame in ImageSequence.Iterator(image):
+            yield frame.convert('RGB'), frame.info.get('duration') or duration
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Writes GIF files with only changed regions of the frames.')
+    parser.add_argument('paths', nargs='+', help='GIF files or directories of .png frames')
+    parser.add_argument('--output-dir', default='optimized')
+    parser.add_argument('--duration', type=int, default=150, help='display time of a frame in ms (for .png frames)')
+    arguments = parser.parse_args()
+
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    for path in arguments.paths:
+        output_file_name = os.path.join(arguments.output_dir, os.path.splitext(os.path.basename(path.rstrip('/\\')))[0] + '.gif')
+        start = time.perf_counter()
+        with DeltaGifEncoder(output_file_name, arguments.duration) as encoder:
+            for frame, duration in readFrames(path, arguments.duration): encoder.addFrame(frame, duration)
+        size = sum(os.path.getsize(os.path.join(path, i)) for i in os.listdir(path)) if os.path.isdir(path) else os.path.getsize(path)
+        kept = not os.path.isdir(path) and os.path.getsize(output_file_name) >= size
+        if kept: shutil.copyfile(path, output_file_name)
+        print(f'{path}: {size/1024:.0f} KB -> {os.path.getsize(output_file_name)/1024:.0f} KB{" (kept)" if kept else ""}, '
+            f'{encoder.stats["local_palettes"]} local palettes, {time.perf_counter() - start:.1f} s')
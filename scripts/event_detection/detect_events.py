@@ -0,0 +1,28 @@
+# This script reads data from manualy corrected .csv file (data.csv) from The World Bank and finds
+# events in all population series at once: rank overtakes and sudden changes of population growth
+# of countries which are in the top N in at least one year. Events are written to a .csv file (year;type;country;other;change;text),
+# so highlights of every generated animation are known without setting years by hand.
+# Usage: python detect_events.py data.csv --top-n 20 --output events.csv
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.event_detection import detectEvents
+from common.population_dataset import PopulationDataset
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Finds rank overtakes and sudden population changes.')
+    parser.add_argument('file_name')
+    parser.add_argument('--top-n', type=int, default=20, help='events are looked for among countries of the top N')
+    parser.add_argument('--min-change', type=float, default=0.015)
+    parser.add_argument('--deviations', type=float, default=3)
+    parser.add_argument('--output', default='events.csv')
+    arguments = parser.parse_args()
+
+    dataset = PopulationDataset(arguments.file_name)
+    events = detectEvents(dataset, top_n=arguments.top_n, min_change=arguments.min_change, deviations=arguments.deviations)
+    with open(arguments.output, 'w') as file:
+        for event in events:
+            file.write(f"{event['year']};{event['type']};{event['country']};{event['other'] or ''};"
+                f"{event['change']:.6g};{event['text']}\n")
+    print(f'{len(events)} events written to {arguments.output}')
@@ -0,0 +1,26 @@
+# This script downloads indicator data from The World Bank API (or a local mirror given with --base-url)
+# and writes it in the format of data.csv, without aggregates (regions, income groups, World),
+# so the file doesn't have to be corrected by hand. Answers are cached in --cache-dir and a second
+# run downloads only pages which changed.
+# Usage: python download_indicator.py --indicator SP.POP.TOTL --output data.csv
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.http_data_source import HttpDataSource
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Downloads indicator data from The World Bank API.')
+    parser.add_argument('--base-url', default='https://api.worldbank.org/v2')
+    parser.add_argument('--indicator', default='SP.POP.TOTL')
+    parser.add_argument('--indicator-name', default='Population, total')
+    parser.add_argument('--cache-dir', default='http_cache')
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--include-aggregates', action='store_true')
+    parser.add_argument('--output', default='data.csv')
+    arguments = parser.parse_args()
+
+    with HttpDataSource(arguments.base_url, arguments.cache_dir, arguments.connections) as source:
+        dataset = source.loadDataset(arguments.indicator, arguments.include_aggregates)
+        print(source.stats)
+    dataset.writeCsv(arguments.output, indicator_name=arguments.indicator_name, indicator_code=arguments.indicator)
@@ -3,28 +3,39 @@
 # Then it generates an animated bar plot using matplotlib.animation which shows population sizes 
 # of the chosen countries in one year (1960-current year). 
 # Plots are black & white
+import os
+import sys
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.year_axis import YearAxis
 class PopulationPlotsGenerator:
-    def __init__(self, file_name, chosen_countries, x_title, bar_textures, output_file_name):
+    def __init__(self, file_name, chosen_countries, x_title, bar_textures, output_file_name, render_options=None):
         self.file_name = file_name
         self.chosen_countries = chosen_countries
         self.x_title = x_title
         self.bar_textures = bar_textures
         self.output_file_name = output_file_name
+        self.render_options = render_options
         self.countries = {} # dictionary where each key is a country name and each value is a list of
         # population sizes year by year
         self.country_codes = {} # key-country name, value-country code
         self.years = []
+        self.year_columns = None # YearAxis of self.years, columns of the lists in self.countries
         self.plot_data = {} # dictionary where each key is a year and each value is a list of 
         # tuples (country_name, population_size). Contains only chosen countries.
         self.max_population = 0
+        self.year_axis = None # YearAxis of the years of plot_data, frames are its column indexes
+        self.heights = None # array years x chosen countries, population sizes in millions
 
         self.bars_container = None
         self.bar_text_list = None
         self.year_count = None
-        self.readCsv()
-        self.preparePlotData()
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.preparePlotData()
         self.generatePlots()
 
     def readCsv(self):
@@ -32,6 +43,7 @@ class PopulationPlotsGenerator:
             rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
             titles = [i[1:] for i in rows[0].split('",')[:-1]]
             self.years = titles[4:].copy()
+            self.year_columns = YearAxis(self.years)
             for row in rows[1:]:
                 country_data = row.split('",')[:-1]
                 self.countries[country_data[0][1:]] = [int(i[1:]) if i[1:] else None for i in country_data[4:]]
@@ -39,7 +51,7 @@ class PopulationPlotsGenerator:
     def extractDataFromYear(self, year):
         # Method that returns dicitonary with data from the indicated year. Each key is a country name
         # and each value its population size. 
-        year_index = self.years.index(year)
+        year_index = self.year_columns.index(year)
         return_list = []
         for i in self.countries:
             population_size = None
@@ -89,14 +101,15 @@ class PopulationPlotsGenerator:
         
         ax.grid(zorder=1, axis='y', color='#d4d4d4')
         # create animation
-        animation = FuncAnimation(fig, func=self.animationFunction, frames=self.years[1:], interval=150, repeat=True, 
-            blit=False)
-        animation.save(self.output_file_name)
+        # frames are column indexes of the heights array, year numbers are taken from the year axis
+        self.year_axis = YearAxis(self.plot_data)
+        self.heights = np.array([[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data])
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.year_axis)), self.output_file_name,
+            self.render_options)
 
-    def animationFunction(self, year):
-        data = self.plot_data[year]
-        heights = [data[i][1]/1000000 for i in range(len(data))]
-        self.year_count.set_text(year)
+    def animationFunction(self, year_index):
+        heights = self.heights[year_index]
+        self.year_count.set_text(str(self.year_axis.values[year_index]))
         # update bars height
         for index, bar in enumerate(self.bars_container.get_children()):
             height = heights[index]
@@ -2,30 +2,52 @@
 # containing population data from all countries. 
 # It generates an animated line plot using matplotlib.animation which shows population sizes 
 # of the chosen countries in one year (1960-current year). 
+# With downsampling='lttb' or 'minmax' long series are reduced to about one point per pixel of the axes
+# before the animation (see common/downsampling.py), so drawing a frame doesn't depend on series length.
+# If the output file name ends with .html, the data of the frames is written with a canvas player instead.
+import os
+import sys
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.html_export import exportChart, isHtmlOutput
+from common.downsampling import downsample
+from common.label_layout import LabelLayout
+from common.year_axis import YearAxis
 class PopulationPlotsGenerator:
-    def __init__(self, file_name, chosen_countries, x_title, line_colors, output_file_name, figure_color='white'):
+    def __init__(self, file_name, chosen_countries, x_title, line_colors, output_file_name, figure_color='white', render_options=None,
+            downsampling=None):
         self.file_name = file_name
         self.chosen_countries = chosen_countries
         self.x_title = x_title
         self.line_colors = line_colors
         self.output_file_name = output_file_name
+        self.render_options = render_options
         self.figure_color = figure_color
+        self.downsampling = downsampling # None, 'lttb' or 'minmax'
         self.countries = {} # dictionary where each key is a country name and each value is a list of
         # population sizes year by year
         self.country_codes = {} # key-country name, value-country code
         self.years = []
+        self.year_columns = None # YearAxis of self.years, columns of the lists in self.countries
         self.plot_data = {} # dictionary where each key is a year and each value is a list of 
         # tuples (country_name, population_size). Contains only chosen countries.
         self.max_population = 0
+        self.year_axis = None # YearAxis of the years of plot_data, frames are its column indexes
+        self.x_values = None # years of plot_data as numbers
+        self.heights = None # array years x chosen countries, population sizes in millions
+        self.kept_points = [] # for every line indexes of years drawn after downsampling
     
         self.year_count = None
         self.line_text_list = None
+        self.label_layout = None # moves line labels which would overlap
         self.lines_list = []
 
-        self.readCsv()
-        self.preparePlotData()
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.preparePlotData()
         self.generatePlots()
 
     def readCsv(self):
@@ -33,6 +55,7 @@ class PopulationPlotsGenerator:
             rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
             titles = [i[1:] for i in rows[0].split('",')[:-1]]
             self.years = titles[4:].copy()
+            self.year_columns = YearAxis(self.years)
             for row in rows[1:]:
                 country_data = row.split('",')[:-1]
                 self.countries[country_data[0][1:]] = [int(i[1:]) if i[1:] else None for i in country_data[4:]]
@@ -41,7 +64,7 @@ class PopulationPlotsGenerator:
     def extractDataFromYear(self, year):
         # Method that returns dicitonary with data from the indicated year. Each key is a country name
         # and each value its population size. 
-        year_index = self.years.index(year)
+        year_index = self.year_columns.index(year)
         return_list = []
         for i in self.countries:
             population_size = None
@@ -71,6 +94,11 @@ class PopulationPlotsGenerator:
         country_names = [i[0] for i in data]
         country_codes = [self.country_codes[i] for i in country_names]
         heights = [i[1]/1000000 for i in data]
+        if isHtmlOutput(self.output_file_name):
+            exportChart(self.output_file_name, 'line', list(self.plot_data), country_codes, self.line_colors,
+                [[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data], names=country_names,
+                title='Population size by year', x_label=self.x_title, figure_color=self.figure_color, max_value=max_y)
+            return
 
         fig, ax = plt.subplots(figsize=(13,5))
         fig.set_facecolor(self.figure_color)
@@ -81,6 +109,15 @@ class PopulationPlotsGenerator:
         ax.set_title('Population size by year', size=20, fontweight='bold')
         ax.set_xlabel(self.x_title, size=12, fontweight='bold')
 
+        # choose points of the lines, all points without downsampling
+        self.year_axis = YearAxis(self.plot_data)
+        self.x_values = self.year_axis.values
+        self.heights = np.array([[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data])
+        for i in range(len(country_names)):
+            if self.downsampling: self.kept_points.append(downsample(self.x_values, self.heights[:, i],
+                int(ax.bbox.width), self.downsampling))
+            else: self.kept_points.append(np.arange(len(self.x_values)))
+
         # create lines
         for i in range(len(country_names)):
             self.lines_list.append(ax.plot([int(year_0)],[heights[i]], self.line_colors[i],
@@ -89,6 +126,8 @@ class PopulationPlotsGenerator:
         # create line labels
         self.line_text_list = [ax.text(int(year_0)+1, height, country_codes[index], size=10,
             horizontalalignment='left', verticalalignment='center',zorder=11) for index, height in enumerate(heights)]
+        self.label_layout = LabelLayout(ax, self.line_text_list)
+        self.label_layout.place([int(year_0)+1]*len(heights), heights)
 
         # add year counter
         self.year_count = ax.text(ax.get_xlim()[0]+3, max_y*0.93, year_0, horizontalalignment='left', 
@@ -98,26 +137,20 @@ class PopulationPlotsGenerator:
         ax.grid(zorder=1, axis='y', color='#d4d4d4')
 
         # create animation
-        animation = FuncAnimation(fig, func=self.animationFunction, frames=self.years[1:], interval=150, repeat=True, 
-            blit=False)
-        animation.save(self.output_file_name)
+        # frames are column indexes of the arrays above, year numbers are taken from the year axis
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.year_axis)), self.output_file_name,
+            self.render_options)
 
-    def animationFunction(self, year):
-        data = self.plot_data[year]
-        heights = [data[i][1]/1000000 for i in range(len(data))]
-        self.year_count.set_text(year)
-        # update lines
+    def animationFunction(self, year_index):
+        year_number = self.x_values[year_index]
+        heights = self.heights[year_index]
+        self.year_count.set_text(str(year_number))
+        # update lines: kept points up to the year and the point of the year
         for index, line in enumerate(self.lines_list):
-            xdata = list(line.get_xdata())
-            xdata.append(int(year))
-            line.set_xdata(xdata)
-
-            ydata = list(line.get_ydata())
-            ydata.append(heights[index])
-            line.set_ydata(ydata)
-
-            self.line_text_list[index].set_y(heights[index])
-            self.line_text_list[index].set_x(int(year)+1)
+            points = self.kept_points[index][:np.searchsorted(self.kept_points[index], year_index, side='right')]
+            if points[-1] != year_index: points = np.append(points, year_index)
+            line.set_data(self.x_values[points], self.heights[points, index])
+        self.label_layout.place([year_number+1]*len(heights), heights)
 
 if __name__=="__main__":
     PopulationPlotsGenerator(
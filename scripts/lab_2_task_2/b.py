@@ -1,22 +1,31 @@
 # This script reads data from manualy corrected .csv file (data.csv) from The World Bank,
 # containing population data from all countries. 
-# It also reads country size data from country_sizes.csv.
+# It also reads country size data from country_sizes.csv and joins it to the population data once.
 # Then it chooses random year and random country and finds 4 closest countries by population size in
 # the drawn year (2 lower and 2 higher).
 # Then it generates an animated bubble plot using matplotlib.animation which shows population sizes
 # of the chosen countries (1960-current year) and also their population densities. 
+# If the output file name ends with .html, the data of the frames is written with a canvas player instead.
 from turtle import color
+import os
+import sys
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.html_export import exportChart, isHtmlOutput
+from common.label_layout import LabelLayout
+from common.population_dataset import PopulationDataset
 import random
+import numpy as np
 class PopulationPlotsGenerator_RandomChoice:
-    def __init__(self, population_file_name, country_sizes_file_name,bubble_colors, output_file_name, figure_color='white'):
+    def __init__(self, population_file_name, country_sizes_file_name,bubble_colors, output_file_name, figure_color='white', render_options=None):
         self.file_name = population_file_name
         self.country_sizes_file_name = country_sizes_file_name
         self.chosen_countries = []
         self.x_title = ""
         self.bubble_colors = bubble_colors
         self.output_file_name = output_file_name
+        self.render_options = render_options
         self.figure_color = figure_color
         self.countries = {} # dictionary where each key is a country name and each value is a list of
         # population sizes year by year
@@ -24,10 +33,12 @@ class PopulationPlotsGenerator_RandomChoice:
         self.years = []
         self.plot_data = {} # dictionary where each key is a year and each value is a list of 
         # tuples (country_name, population_size). Contains only chosen countries.
-        self.country_sizes = {} # key-country name, value-country size in sq.km
+        self.dataset = None # population matrix with country sizes joined to its rows
+        self.bubble_sizes = None # array years x chosen countries, bubble size computed from density
         self.max_population = 0
 
         self.bubble_text_list = None
+        self.label_layout = None # moves bubble labels which would overlap
         self.year_count = None
         self.bubbles_list = []
         self.ax = None
@@ -35,39 +46,28 @@ class PopulationPlotsGenerator_RandomChoice:
         self.min_country_density = 10000000000
         self.max_country_density = 0
 
-        self.readCsv()
-        self.readCountrySizeCSV()
-        self.getRandomCountryAndYear()
-        self.preparePlotData()
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+            self.readCountrySizeCSV()
+        with renderStage(self.render_options, 'prepare'):
+            self.getRandomCountryAndYear()
+            self.preparePlotData()
         self.generatePlots()
 
     def readCsv(self):
-        with open(self.file_name) as data_file:
-            rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
-            titles = [i[1:] for i in rows[0].split('",')[:-1]]
-            self.years = titles[4:].copy()
-            for row in rows[1:]:
-                country_data = row.split('",')[:-1]
-                self.countries[country_data[0][1:]] = [int(i[1:]) if i[1:] else None for i in country_data[4:]]
-                self.country_codes[country_data[0][1:]] = country_data[1][1:]
+        self.dataset = PopulationDataset(self.file_name)
+        self.years = self.dataset.years.labels()
+        self.countries = self.dataset.asCountries()
+        self.country_codes = dict(zip(self.dataset.names.tolist(), self.dataset.codes.tolist()))
 
     def readCountrySizeCSV(self):
-        with open(self.country_sizes_file_name) as file:
-            lines = file.read().split('\n')[:-1]
-            for i in lines: self.country_sizes[i.split(';')[0]]=float(i.split(';')[1])
+        # sizes are joined to the dataset rows once, density of all countries and years is computed there
+        self.dataset.readCountrySizeCSV(self.country_sizes_file_name)
 
     def extractDataFromYear(self, year):
         # Method that returns dicitonary with data from the indicated year. Each key is a country name
-        # and each value its population size. 
-        year_index = self.years.index(year)
-        return_list = []
-        for i in self.countries:
-            population_size = None
-            try: population_size = self.countries[i][year_index]
-            except: pass
-            if population_size: return_list.append((i, population_size))
-        return_list.sort(key= lambda x: x[1], reverse=True)
-        return{i[0]:i[1] for i in return_list}
+        # and each value its population size. The column is found through the year axis of the dataset.
+        return self.dataset.extractDataFromYear(year)
 
     def preparePlotData(self):
         # Fills self.plot_data dictionary
@@ -82,13 +82,11 @@ class PopulationPlotsGenerator_RandomChoice:
                     year_data.append((country, self.countries[country][i]))
                 self.plot_data[self.years[i]]=year_data
             except: pass
-        # Find min and max density
-        country_sizes = {i:self.country_sizes[i] for i in self.chosen_countries}
-        for i in self.chosen_countries:
-            country_min = min(self.countries[i])            
-            if  country_min/country_sizes[i] < self.min_country_density: self.min_country_density = country_min/country_sizes[i]
-            country_max = max(self.countries[i])
-            if  country_max/country_sizes[i] > self.max_country_density: self.max_country_density = country_max/country_sizes[i]
+        # Find min and max density and scale densities of all years to bubble sizes at once
+        rows = self.dataset.rows(self.chosen_countries)
+        self.min_country_density, self.max_country_density = self.dataset.densityExtrema(rows)
+        self.bubble_sizes = ((self.dataset.density[:, rows]-self.min_country_density)
+            /(self.max_country_density-self.min_country_density)*4600+400)
 
     def randomYear(self):
         year_index = random.randint(0,len(self.years)-1)
@@ -117,6 +115,12 @@ class PopulationPlotsGenerator_RandomChoice:
         country_names = [i[0] for i in data]
         country_codes = [self.country_codes[i] for i in country_names]
         heights = [i[1]/1000000 for i in data]
+        if isHtmlOutput(self.output_file_name):
+            exportChart(self.output_file_name, 'bubble', list(self.plot_data), country_codes, self.bubble_colors,
+                [[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data], names=country_names,
+                sizes=self.bubble_sizes[self.dataset.years.indexes(list(self.plot_data))],
+                title='Population size by year', x_label=self.x_title, figure_color=self.figure_color, max_value=max_y)
+            return
 
         fig, ax = plt.subplots(figsize=(13,5))
         fig.set_facecolor(self.figure_color)
@@ -130,16 +134,16 @@ class PopulationPlotsGenerator_RandomChoice:
 
         # create bubbles
         for i in range(len(country_names)):
-            density = data[i][1]/self.country_sizes[country_names[i]]
             self.bubbles_list.append(ax.scatter([int(year_0)],[heights[i]], color=self.bubble_colors[i],zorder=10, 
-                s=(density-self.min_country_density)/(self.max_country_density-self.min_country_density)*4600+400,
-                alpha=0.5
+                s=self.bubble_sizes[0][i], alpha=0.5
             ))
         # create bubble labels
         self.bubble_text_list = [ax.text(int(year_0), height, country_codes[index], size=10,
             horizontalalignment='center', verticalalignment='center',zorder=11, alpha=0.5,
             color='#0a0a0a'
             ) for index, height in enumerate(heights)]
+        self.label_layout = LabelLayout(ax, self.bubble_text_list)
+        self.label_layout.place([int(year_0)]*len(heights), heights)
 
         # add year counter
         self.year_count = ax.text(ax.get_xlim()[0]+3, max_y*0.93, year_0, horizontalalignment='left', 
@@ -149,32 +153,29 @@ class PopulationPlotsGenerator_RandomChoice:
         ax.grid(zorder=1, axis='y', color='#d4d4d4')
 
         # create animation
-        animation = FuncAnimation(fig, func=self.animationFunction, frames=self.years[1:], interval=150, repeat=True, 
-            blit=False)
-        animation.save(self.output_file_name)
+        # frames are column indexes of the dataset, year numbers are taken from its integer year axis
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.years)), self.output_file_name,
+            self.render_options)
 
-    def animationFunction(self, year):
+    def animationFunction(self, year_index):
+        year, year_number = self.years[year_index], self.dataset.years.values[year_index]
         data = self.plot_data[year]
         heights = [data[i][1]/1000000 for i in range(len(data))]
-        densities = [data[index][1]/self.country_sizes[i] for index, i in enumerate(self.chosen_countries)]
-        densities = [(i-self.min_country_density)/(self.max_country_density-self.min_country_density)*4600+400
-            for i in densities]
+        densities = self.bubble_sizes[year_index]
         self.year_count.set_text(year)
 
         # remove bubbles
-        if int(year)%7!=0:
+        if year_number%7!=0:
             for i in self.bubbles_list: i.remove()
         self.bubbles_list = []
 
         # add bubbles
         for index, _ in enumerate(self.chosen_countries):
             
-            self.bubbles_list.append(self.ax.scatter([int(year)],[heights[index]], color=self.bubble_colors[index],
+            self.bubbles_list.append(self.ax.scatter([year_number],[heights[index]], color=self.bubble_colors[index],
                 zorder=10, s=densities[index],alpha=0.5 
                 ))
-
-            self.bubble_text_list[index].set_y(heights[index])
-            self.bubble_text_list[index].set_x(int(year))
+        self.label_layout.place([year_number]*len(heights), heights)
 
 if __name__=="__main__":
     PopulationPlotsGenerator_RandomChoice(
@@ -4,30 +4,43 @@
 # the drawn year (2 lower and 2 higher).
 # Then it generates an animated pie chart using matplotlib.animation which shows population sizes
 # of the chosen countries in one year (1960-current year). 
+# If the output file name ends with .html, the data of the frames is written with a canvas player instead.
+import os
+import sys
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.html_export import exportChart, isHtmlOutput
+from common.year_axis import YearAxis
 import matplotlib.patches as mpatches
 
 import random
 class PopulationPlotsGenerator_RandomChoice_PolandCentered:
-    def __init__(self, file_name,pie_colors, output_file_name, figure_color='white'):
+    def __init__(self, file_name,pie_colors, output_file_name, figure_color='white', render_options=None):
         self.file_name = file_name
         self.chosen_countries = []
         self.subtitle = ""
         self.pie_colors = pie_colors
         self.output_file_name = output_file_name
+        self.render_options = render_options
         self.figure_color = figure_color
         self.countries = {} # dictionary where each key is a country name and each value is a list of
         # population sizes year by year
         self.country_codes = {} # key-country name, value-country code
         self.years = []
+        self.year_columns = None # YearAxis of self.years, columns of the lists in self.countries
         self.plot_data = {} # dictionary where each key is a year and each value is a list of 
         # tuples (country_name, population_size). Contains only chosen countries.
         self.max_population = 0
+        self.year_axis = None # YearAxis of the years of plot_data, frames are its column indexes
+        self.heights = None # array years x chosen countries, population sizes in millions
         
-        self.readCsv()
-        self.getRandomYear()
-        self.preparePlotData()
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.getRandomYear()
+            self.preparePlotData()
         self.generatePlots()
 
     def readCsv(self):
@@ -35,6 +48,7 @@ class PopulationPlotsGenerator_RandomChoice_PolandCentered:
             rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
             titles = [i[1:] for i in rows[0].split('",')[:-1]]
             self.years = titles[4:].copy()
+            self.year_columns = YearAxis(self.years)
             for row in rows[1:]:
                 country_data = row.split('",')[:-1]
                 self.countries[country_data[0][1:]] = [int(i[1:]) if i[1:] else None for i in country_data[4:]]
@@ -43,7 +57,7 @@ class PopulationPlotsGenerator_RandomChoice_PolandCentered:
     def extractDataFromYear(self, year):
         # Method that returns dicitonary with data from the indicated year. Each key is a country name
         # and each value its population size. 
-        year_index = self.years.index(year)
+        year_index = self.year_columns.index(year)
         return_list = []
         for i in self.countries:
             population_size = None
@@ -94,6 +108,11 @@ class PopulationPlotsGenerator_RandomChoice_PolandCentered:
         country_names = [i[0] for i in data]
         country_codes = [self.country_codes[i] for i in country_names]
         sizes = [i[1]/1000000 for i in data]
+        if isHtmlOutput(self.output_file_name):
+            exportChart(self.output_file_name, 'pie', list(self.plot_data), country_codes, self.pie_colors,
+                [[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data], names=country_names,
+                title='Total population of 5 five countries', x_label=self.subtitle, figure_color=self.figure_color)
+            return
 
         fig, ax = plt.subplots(figsize=(8,8))
         fig.set_facecolor(self.figure_color)
@@ -121,16 +140,17 @@ class PopulationPlotsGenerator_RandomChoice_PolandCentered:
            bbox={'facecolor': 'white', 'pad': 5,'edgecolor': '#d4d4d4'})
 
         # create animation
-        animation = FuncAnimation(fig, func=self.animationFunction, frames=self.years[1:], interval=150, repeat=True, 
-            blit=False)
-        animation.save(self.output_file_name)
+        # frames are column indexes of the heights array, year numbers are taken from the year axis
+        self.year_axis = YearAxis(self.plot_data)
+        self.heights = np.array([[i[1]/1000000 for i in self.plot_data[year]] for year in self.plot_data])
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.year_axis)), self.output_file_name,
+            self.render_options)
 
-    def animationFunction(self, year):
+    def animationFunction(self, year_index):
+        year = str(self.year_axis.values[year_index])
         print(year)
-        data = self.plot_data[year]
-        sizes = [i[1]/1000000 for i in data]
-        country_names = [i[0] for i in data]
-        country_codes = [self.country_codes[i] for i in country_names]
+        sizes = self.heights[year_index].tolist()
+        country_codes = [self.country_codes[i] for i in self.chosen_countries]
         ax = self.ax
         ax.clear()
         
@@ -2,31 +2,50 @@
 # containing population data from all countries. 
 # Then it generates an animated bar plot using matplotlib.animation which shows population sizes 
 # of the chosen countries in one year (1960-current year). 
+# With detect_events=True years to slow down and annotations are found automatically
+# (rank overtakes and sudden population changes, see common/event_detection.py)
+# instead of the years of the breakup of Yugoslavia set for this task.
+import os
+import sys
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import renderStage, saveAnimation
+from common.event_detection import detectEvents, eventWindows, slowedDownFrames
+from common.population_dataset import PopulationDataset
+from common.year_axis import YearAxis
 class PopulationPlotsGenerator:
-    def __init__(self, file_name, chosen_countries, x_title, bar_colors, output_file_name, figure_color='white'):
+    def __init__(self, file_name, chosen_countries, x_title, bar_colors, output_file_name, figure_color='white', render_options=None, detect_events=False):
         self.file_name = file_name
         self.chosen_countries = chosen_countries
         self.x_title = x_title
         self.bar_colors = bar_colors
         self.output_file_name = output_file_name
+        self.render_options = render_options
         self.figure_color = figure_color
+        self.detect_events = detect_events
         self.countries = {} # dictionary where each key is a country name and each value is a list of
         # population sizes year by year
         self.country_codes = {} # key-country name, value-country code
         self.years = []
+        self.year_columns = None # YearAxis of self.years, columns of the lists in self.countries
         self.plot_data = {} # dictionary where each key is a year and each value is a list of 
         # tuples (country_name, population_size). Contains only chosen countries.
         self.max_population = 0
+        self.heights = None # array years x chosen countries, population sizes in millions (nan where unknown)
 
         self.bars_container = None
         self.bar_text_list = None
         self.year_count = None
         self.war_info = None
         self.ax = None
-        self.readCsv()
-        self.preparePlotData()
+        self.frames = None # column indexes of the years, years to slow down are repeated
+        self.event_windows = [] # list of tuples (first_year, last_year, events) of detected events
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.preparePlotData()
+            self.prepareFrames()
         self.generatePlots()
 
     def readCsv(self):
@@ -34,6 +53,7 @@ class PopulationPlotsGenerator:
             rows = data_file.read().split('\n') # used read+split instead of readlines not to deal with EOL signs
             titles = [i[1:] for i in rows[0].split('",')[:-1]]
             self.years = titles[4:].copy()
+            self.year_columns = YearAxis(self.years)
             for row in rows[1:]:
                 country_data = row.split('",')[:-1]
                 self.countries[country_data[0][1:]] = [int(i[1:]) if i[1:] else None for i in country_data[4:]]
@@ -41,7 +61,7 @@ class PopulationPlotsGenerator:
     def extractDataFromYear(self, year):
         # Method that returns dicitonary with data from the indicated year. Each key is a country name
         # and each value its population size. 
-        year_index = self.years.index(year)
+        year_index = self.year_columns.index(year)
         return_list = []
         for i in self.countries:
             population_size = None
@@ -63,6 +83,25 @@ class PopulationPlotsGenerator:
                     year_data.append((country, self.countries[country][i]))
                 self.plot_data[self.years[i]]=year_data
             except: pass
+
+    def prepareFrames(self):
+        # frames are column indexes, years are taken from the year axis
+        self.heights = np.array([[np.nan if i is None else i/1000000 for i in self.countries[country]]
+            for country in self.chosen_countries]).T
+        if not self.detect_events:
+            # list with repeated years
+            years = list(range(1960, 1990))
+            for i in (1990,1991,1992,1993,1994,1995): years.extend([i]*6)
+            years.extend(range(1996,2021))
+            self.frames = self.year_columns.indexes(years)
+            return
+        values = np.array([[i or 0 for i in self.countries[country]] for country in self.chosen_countries])
+        mask = np.array([[i is not None for i in self.countries[country]] for country in self.chosen_countries])
+        dataset = PopulationDataset.fromArrays(self.chosen_countries,
+            [self.country_codes[i] for i in self.chosen_countries], self.years, values, mask)
+        self.event_windows = eventWindows(detectEvents(dataset))
+        self.frames = self.year_columns.indexes(slowedDownFrames(
+            [int(i) for i in self.years if i in self.plot_data], self.event_windows))
     
     def generatePlots(self):
         year_0 = self.years[0]
@@ -75,7 +114,8 @@ class PopulationPlotsGenerator:
         fig, ax = plt.subplots(figsize=(13,5))
         self.ax = ax
         fig.set_facecolor(self.figure_color)
-        ax.set_ylim([0,15]) # axis arbitrary fixed for this task
+        if self.detect_events: ax.set_ylim([0,int(self.max_population/1000000 * 1.1)+1])
+        else: ax.set_ylim([0,15]) # axis arbitrary fixed for this task
         ax.set_ylabel('Population size [mln]', size=12, fontweight='bold')
         ax.set_title('Population size by year', size=20, fontweight='bold')
         ax.set_xlabel(self.x_title, size=12, fontweight='bold')
@@ -90,34 +130,44 @@ class PopulationPlotsGenerator:
            bbox={'facecolor': 'white', 'pad': 5,'edgecolor': '#d4d4d4'})
         
         ax.grid(zorder=1, axis='y', color='#d4d4d4')
-        # list with repeated years
-        frames = [str(year) for year in range(1960, 1990)]
-        for i in (1990,1991,1992,1993,1994,1995): frames.extend([str(i)]*6)
-        frames.extend(str(i) for i in range(1996,2021))
-        print(frames)
+        print(self.year_columns.labels(self.frames))
         # create animation
-        animation = FuncAnimation(fig, func=self.animationFunction, frames=frames, interval=150, repeat=True, 
-            blit=False)
-        animation.save(self.output_file_name)
+        saveAnimation(fig, self.animationFunction, self.frames, self.output_file_name, self.render_options)
 
-    def animationFunction(self, year):
-        data = self.plot_data[year]
-        heights = [data[i][1]/1000000 for i in range(len(data))]
-        self.year_count.set_text(year)
+    def animationFunction(self, year_index):
+        year = int(self.year_columns.values[year_index])
+        heights = self.heights[year_index]
+        self.year_count.set_text(str(year))
         # update bars height
         for index, bar in enumerate(self.bars_container.get_children()):
             height = heights[index]
             bar.set_height(height)
             self.bar_text_list[index].set_y(heights[index]+self.max_population/1000000*0.01)
+        if self.detect_events:
+            self.annotateEvents(year)
+            return
         # add war info
-        if year == '1990' and self.war_info == None:
+        if year == 1990 and self.war_info == None:
             self.war_info = self.ax.text(2.5,12,'BREAKUP OF YUGOSLAVIA',horizontalalignment='center', 
            verticalalignment='bottom',size='20',color='red')
             self.year_count.set_color('red')
-        if year == '1996':
+        if year == 1996:
             self.war_info.remove()
             self.year_count.set_color('black')
 
+    def annotateEvents(self, year):
+        # shows texts of the last 3 events which already happened in the window around them
+        window = [i for i in self.event_windows if i[0] <= year <= i[1]]
+        events = [event for event in window[0][2] if event['year'] <= year][-3:] if window else []
+        text = '\n'.join(event['text'] for event in events) if events else None
+        if self.war_info is not None and (text is None or self.war_info.get_text() != text):
+            self.war_info.remove()
+            self.war_info = None
+            self.year_count.set_color('black')
+        if text is not None and self.war_info is None:
+            self.war_info = self.ax.text((len(self.chosen_countries)-1)/2, self.ax.get_ylim()[1]*0.8, text,
+                horizontalalignment='center', verticalalignment='bottom', size='14', color='red')
+            self.year_count.set_color('red')
 
 
 if __name__=="__main__":
@@ -1,5 +1,9 @@
+import os
+import sys
 from matplotlib import pyplot as plt
 import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.figure_output import saveFigure
 # read data
 dataframe = pd.read_csv('table.csv')
 dataframe.START=pd.to_datetime(dataframe.START, dayfirst=True)
@@ -27,6 +31,6 @@ months = ['Oct 1st','Nov 1st','Dec 1st','Jan 1st','Feb 1st', 'Mar 1st','Apr 1st'
 months_durations = [31,30,31,31,28,31,30,31,30,31,31,30,31]
 ax.set_xticks([sum(months_durations[:i]) for i in range(len(months_durations))],labels=months)
 
-plt.savefig('gannt_plot_colored.pdf',dpi=200,format='pdf')
-plt.savefig('gannt_plot_colored.png')
+# draw once, write png from the same draw, rasterize bars in pdf if there are many of them
+saveFigure(fig, ['gannt_plot_colored.pdf', 'gannt_plot_colored.png'], dpi=200)
 plt.show()
\ No newline at end of file
@@ -0,0 +1,31 @@
+# This script runs a generator script (its __main__ block) in preview mode: frames are rendered
+# at lower dpi, only every Nth frame is taken and with --contact-sheet only the first and the last
+# frame are written side by side to a .png file. The generator code and the output stage are the same
+# as in the final render, only RenderOptions differ.
+# Usage (from the directory with data.csv):
+#   python preview_generator.py ../lab_2_task_2/a.py --stride 5 --dpi 50
+#   python preview_generator.py ../lab_2_task_2/a.py --contact-sheet
+import argparse
+import os
+import runpy
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import animation_output
+from common.animation_output import RenderOptions
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Renders a preview of a generator script.')
+    parser.add_argument('script')
+    parser.add_argument('--stride', type=int, default=5, help='every Nth frame is rendered')
+    parser.add_argument('--dpi', type=int, default=50)
+    parser.add_argument('--scale', type=float, default=1.0, help='figure size multiplier')
+    parser.add_argument('--contact-sheet', action='store_true', help='only the first and the last frame in one .png')
+    parser.add_argument('--delta-frames', action='store_true', help='GIF frames hold only the changed region')
+    arguments = parser.parse_args()
+
+    animation_output.default_render_options = RenderOptions.preview(arguments.stride, arguments.dpi,
+        arguments.scale, arguments.contact_sheet, delta_frames=arguments.delta_frames)
+    start = time.perf_counter()
+    runpy.run_path(arguments.script, run_name='__main__')
+    print(f'preview rendered in {time.perf_counter() - start:.1f} s')
@@ -0,0 +1,243 @@
+# This script runs a local HTTP server which renders charts of the generators on request.
+# The dataset is read once and matplotlib stays imported, so a request doesn't pay for a new Python
+# process and parsing of the .csv file. Results and prepared data of the chosen countries and years
+# (the matrix the frames are drawn from) are kept in LRU caches, so repeated requests are answered
+# from memory.
+# Requests (GET with query parameters or POST with the same keys in a JSON body):
+#   /render?type=line&countries=China,India&years=1990-2010&format=gif
+#   /render?type=bar&selection=top:5:2000&figure_color=%23ded6bd&colors=red,blue,green,black,orange
+#   /render?type=race&top_n=10&years=1960-2000&format=png  (png - the last frame of the animation)
+#   /stats - numbers of requests, cache hits and renders
+# Selection rules: top:<n>:<year> - n most populated countries in the year,
+#                  closest:<country>:<k> - the country and k countries with the most similar trajectories.
+# Usage: python render_service.py data.csv --port 8000
+import argparse
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(SCRIPTS_DIR)
+from common.dataset_cache import loadDataset
+from common.population_dataset import PopulationDataset
+from common.trajectory_similarity import closestTrajectories
+
+GENERATORS = {
+    'bar': ('lab_2_task_1/colored/a.py', 'PopulationPlotsGenerator'),
+    'line': ('lab_2_task_2/a.py', 'PopulationPlotsGenerator'),
+    'race': ('bar_chart_race/bar_chart_race.py', 'BarChartRaceGenerator'),
+}
+DEFAULT_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+
+class LruCache:
+    def __init__(self, max_items=64, max_bytes=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.items = OrderedDict() # key-request, value-(value, size), the least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key][0]
+
+    def put(self, key, value, size=0):
+        with self.lock:
+            if key in self.items: self.size -= self.items.pop(key)[1]
+            self.items[key] = (value, size)
+            self.size += size
+            while len(self.items) > self.max_items or (self.max_bytes and self.size > self.max_bytes and len(self.items) > 1):
+                self.size -= self.items.popitem(last=False)[1][1]
+
+    def stats(self):
+        return {'items': len(self.items), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+
+def loadScript(relative_path):
+    # Imports a generator script by its path (scripts share file names like a.py)
+    module_name = 'render_service_' + relative_path.replace('/', '_').replace('.py', '')
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def warmGenerator(generator_class, dataset):
+    # Subclass of the generator which takes the data from the dataset kept in memory instead of the file
+    class WarmGenerator(generator_class):
+        def readCsv(self):
+            if hasattr(generator_class, 'topIndexes'): # bar chart race works on the dataset itself
+                self.dataset = dataset
+                return
+            self.years = dataset.years.labels()
+            self.countries = dataset.asCountries()
+            self.country_codes = dict(zip(dataset.names.tolist(), dataset.codes.tolist()))
+    return WarmGenerator
+
+
+class RenderService:
+    def __init__(self, file_name, result_cache_mb=256, frame_cache_items=64):
+        self.dataset = loadDataset(file_name)
+        self.generators = {name: getattr(loadScript(path), class_name) for name, (path, class_name) in GENERATORS.items()}
+        self.results = LruCache(max_items=1024, max_bytes=result_cache_mb*1024*1024)
+        self.frame_data = LruCache(max_items=frame_cache_items)
+        self.render_lock = threading.Lock() # pyplot is not thread safe, one chart is rendered at a time
+        self.renders = 0
+
+    def parseRequest(self, parameters):
+        # Normalized request: dictionary with all keys, used also as the key of the result cache
+        chart_type = parameters.get('type', 'line')
+        if chart_type not in self.generators: raise ValueError(f'Unknown chart type: {chart_type}, use one of {list(self.generators)}')
+        output_format = parameters.get('format', 'gif')
+        if output_format not in ('gif', 'png'): raise ValueError(f'Unknown format: {output_format}, use gif or png')
+        first_year, last_year = self.parseYears(parameters.get('years'))
+        countries = self.chooseCountries(parameters, chart_type)
+        colors = parameters.get('colors') or DEFAULT_COLORS
+        if isinstance(colors, str): colors = colors.split(',')
+        return {'type': chart_type, 'format': output_format, 'years': (first_year, last_year),
+            'countries': tuple(countries), 'colors': tuple((colors*len(countries))[:len(countries)]),
+            'figure_color': parameters.get('figure_color', 'white'), 'title': parameters.get('title', ''),
+            'top_n': int(parameters.get('top_n', 10))}
+
+    def parseYears(self, years):
+        # (first, last) year of the range "first-last", all years of the dataset if None
+        axis = self.dataset.years.values
+        if not years: return int(axis[0]), int(axis[-1])
+        try:
+            first_year, last_year = [int(i) for i in str(years).split('-')]
+        except ValueError:
+            raise ValueError(f'Wrong years: {years}, use first-last, e.g. 1990-2010') from None
+        if first_year > last_year: raise ValueError(f'Wrong years: {years}, the first year is after the last one')
+        if first_year < axis[0] or last_year > axis[-1]:
+            raise ValueError(f'Wrong years: {years}, the data has years {axis[0]}-{axis[-1]}')
+        return first_year, last_year
+
+    def chooseCountries(self, parameters, chart_type):
+        countries = parameters.get('countries') or []
+        if isinstance(countries, str): countries = countries.split(',')
+        selection = parameters.get('selection')
+        if selection:
+            rule, *arguments = selection.split(':')
+            if rule not in ('top', 'closest'): raise ValueError(f'Unknown selection rule: {rule}, use top or closest')
+            try:
+                count = int(arguments[0 if rule == 'top' else 1])
+            except (ValueError, IndexError):
+                raise ValueError(f'Wrong selection: {selection}, use top:<n>:<year> or closest:<country>:<k>') from None
+            if rule == 'top':
+                if len(arguments) != 2: raise ValueError(f'Wrong selection: {selection}, use top:<n>:<year>')
+                self.dataset.years.index(arguments[1]) # ValueError for a year out of the data
+                countries = list(self.dataset.extractDataFromYear(arguments[1]))[:count]
+                if not countries: raise ValueError(f'No population data in {arguments[1]}')
+            else:
+                if arguments[0] not in self.dataset.row_indexes: raise ValueError(f'Unknown country: {arguments[0]}')
+                countries = [arguments[0]] + [i[0] for i in closestTrajectories(self.dataset, arguments[0], count)]
+        unknown = [i for i in countries if i not in self.dataset.row_indexes]
+        if unknown: raise ValueError(f'Unknown countries: {unknown}')
+        if not countries and chart_type != 'race': raise ValueError('Give countries or selection')
+        return countries
+
+    def frameData(self, countries, years):
+        # Dataset of the chosen countries (all for an empty list) and years, from the cache if it was prepared before
+        key = (countries, years)
+        data = self.frame_data.get(key)
+        if data is None:
+            rows = self.dataset.rows(countries) if countries else slice(None)
+            columns = self.dataset.years[years[0]:years[1] + 1]
+            data = PopulationDataset.fromArrays(self.dataset.names[rows], self.dataset.codes[rows],
+                self.dataset.years.values[columns], self.dataset.values[rows][:, columns], self.dataset.mask[rows][:, columns])
+            self.frame_data.put(key, data)
+        return data
+
+    def render(self, parameters):
+        # Returns (content type, bytes) of the chart
+        request = self.parseRequest(parameters)
+        key = json.dumps(request, sort_keys=True)
+        result = self.results.get(key)
+        if result is not None: return result
+        data = self.frameData(request['countries'], request['years'])
+        with self.render_lock, tempfile.TemporaryDirectory() as directory:
+            output_file_name = os.path.join(directory, 'chart.gif')
+            generator_class = warmGenerator(self.generators[request['type']], data)
+            try:
+                if request['type'] == 'race':
+                    generator_class('', output_file_name, top_n=request['top_n'], figure_color=request['figure_color'])
+                else:
+                    generator_class('', list(request['countries']), request['title'], list(request['colors']),
+                        output_file_name, figure_color=request['figure_color'])
+            finally:
+                plt.close('all')
+            self.renders += 1
+            with open(output_file_name, 'rb') as file: body = file.read()
+        if request['format'] == 'png':
+            image = Image.open(io.BytesIO(body))
+            image.seek(image.n_frames - 1)
+            png = io.BytesIO()
+            image.convert('RGB').save(png, format='PNG')
+            body = png.getvalue()
+        result = ('image/' + request['format'], body)
+        self.results.put(key, result, len(body))
+        return result
+
+    def stats(self):
+        return {'renders': self.renders, 'results': self.results.stats(), 'frame_data': self.frame_data.stats()}
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    service = None # RenderService shared by all requests
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.answer(url.path, dict(urllib.parse.parse_qsl(url.query)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.answer(urllib.parse.urlsplit(self.path).path, json.loads(self.rfile.read(length) or b'{}'))
+
+    def answer(self, path, parameters):
+        try:
+            if path == '/render': content_type, body = self.service.render(parameters)
+            elif path == '/stats': content_type, body = 'application/json', json.dumps(self.service.stats()).encode()
+            else: return self.send_error(404)
+        # the message goes to the body, the status line has a fixed reason (it must be latin-1)
+        except ValueError as error: # wrong request
+            return self.send_error(400, 'Bad request', explain=str(error))
+        except Exception as error: # the client gets an answer also when rendering fails
+            return self.send_error(500, 'Render failed', explain=f'{type(error).__name__}: {error}')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Renders charts of the generators on request.')
+    parser.add_argument('file_name')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--result-cache-mb', type=int, default=256)
+    parser.add_argument('--frame-cache-items', type=int, default=64)
+    arguments = parser.parse_args()
+
+    RenderRequestHandler.service = RenderService(arguments.file_name, arguments.result_cache_mb, arguments.frame_cache_items)
+    server = ThreadingHTTPServer((arguments.host, arguments.port), RenderRequestHandler)
+    print(f'Serving on http://{arguments.host}:{arguments.port}/render')
+    server.serve_forever()
@@ -0,0 +1,107 @@
+# This script reads data from manualy corrected .csv file (data.csv) from The World Bank,
+# containing population data from all countries.
+# Then it generates an animated grid of small multiples: one small panel per country (all countries
+# of the file by default), each with the population line of the country growing year by year.
+# All panels are drawn in one axes: lines of all countries are one LineCollection, points of the
+# current year one scatter, panel frames one more LineCollection and codes static texts. Panel
+# coordinates of all lines are precomputed, so a frame sets one array slice per collection, and only
+# those collections and the year counter are drawn every frame over the saved rest of the figure.
+import os
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import RenderOptions, renderStage, saveAnimation
+from common.population_dataset import PopulationDataset
+
+
+class SmallMultiplesGenerator:
+    def __init__(self, file_name, output_file_name, chosen_countries=None, columns=None, shared_scale=False,
+            line_color='#002868', figure_color='white', render_options=None):
+        self.file_name = file_name
+        self.output_file_name = output_file_name
+        self.chosen_countries = chosen_countries # all countries of the file if None
+        self.columns = columns # number of panels in a row, chosen for the figure shape if None
+        self.shared_scale = shared_scale # the same population scale in all panels, otherwise every panel to its maximum
+        self.line_color = line_color
+        self.figure_color = figure_color
+        self.render_options = render_options
+        self.dataset = None
+        self.rows = None # rows of the dataset shown in the panels
+        self.corners = None # array panels x 2, upper left corners of the panels
+        self.segments = None # array panels x years x 2, points of the lines in axes coordinates (NaN - unknown)
+        self.years = []
+
+        self.lines = None
+        self.points = None
+        self.year_count = None
+        with renderStage(self.render_options, 'parse'):
+            self.readCsv()
+        with renderStage(self.render_options, 'prepare'):
+            self.preparePlotData()
+        self.generatePlots()
+
+    def readCsv(self):
+        self.dataset = PopulationDataset(self.file_name)
+
+    def panelGrid(self):
+        count = len(self.rows)
+        columns = self.columns or int(np.ceil(np.sqrt(count*1.6)))
+        return columns, int(np.ceil(count/columns))
+
+    def preparePlotData(self):
+        self.rows = self.dataset.rows(self.chosen_countries) if self.chosen_countries else np.arange(len(self.dataset.names))
+        self.years = self.dataset.years.labels()
+        values = np.where(self.dataset.mask[self.rows], self.dataset.values[self.rows], np.nan).astype(np.float64)
+        # heights 0-1 in every panel
+        known_values = np.nan_to_num(values)
+        maxima = known_values.max() if self.shared_scale else known_values.max(axis=1)[:, None]
+        heights = values/np.where(maxima > 0, maxima, 1)
+        # panel (row r, column c) is the square [c, c+1] x [r, r+1] of the axes, y grows downwards
+        columns, _ = self.panelGrid()
+        panel_columns, panel_rows = np.arange(len(self.rows)) % columns, np.arange(len(self.rows))//columns
+        self.corners = np.stack([panel_columns, panel_rows], axis=1)
+        x = np.linspace(0.08, 0.92, len(self.years))
+        self.segments = np.empty((len(self.rows), len(self.years), 2))
+        self.segments[:, :, 0] = panel_columns[:, None] + x[None, :]
+        self.segments[:, :, 1] = panel_rows[:, None] + 0.92 - heights*0.62
+
+    def generatePlots(self):
+        columns, rows = self.panelGrid()
+        fig, ax = plt.subplots(figsize=(columns*0.75, rows*0.6 + 1))
+        fig.set_facecolor(self.figure_color)
+        fig.subplots_adjust(left=0.01, right=0.99, bottom=0.01, top=1 - 0.8/(rows*0.6 + 1))
+        ax.set_xlim([0, columns])
+        ax.set_ylim([rows, 0])
+        ax.set_axis_off()
+        scale = 'the same scale in all panels' if self.shared_scale else 'every panel scaled to its maximum'
+        ax.set_title(f'Population size by year ({scale})', size=14, fontweight='bold')
+
+        # static part: panel frames and country codes, drawn once
+        frames = self.corners[:, None, :] + np.array([[0.03, 0.03], [0.97, 0.03], [0.97, 0.97], [0.03, 0.97], [0.03, 0.03]])
+        ax.add_collection(LineCollection(frames, colors='#d4d4d4', linewidths=0.8))
+        for code, (x, y) in zip(self.dataset.codes[self.rows], self.corners):
+            ax.text(x + 0.08, y + 0.2, code, size=7, verticalalignment='center')
+
+        # animated part: lines, points of the current year and year counter
+        self.lines = ax.add_collection(LineCollection(self.segments[:, :1], colors=self.line_color, linewidths=1))
+        self.points = ax.scatter(self.segments[:, 0, 0], self.segments[:, 0, 1], s=4, color=self.line_color, zorder=3)
+        self.year_count = ax.text(0.99, 1.0, self.years[0], transform=fig.transFigure, horizontalalignment='right',
+            verticalalignment='top', size=16, backgroundcolor=self.figure_color)
+        saveAnimation(fig, self.animationFunction, np.arange(1, len(self.years)), self.output_file_name,
+            self.render_options, animated_artists=[self.lines, self.points, self.year_count])
+
+    def animationFunction(self, year_index):
+        self.lines.set_segments(self.segments[:, :year_index + 1])
+        self.points.set_offsets(self.segments[:, year_index])
+        self.year_count.set_text(self.years[year_index])
+
+
+if __name__=="__main__":
+    SmallMultiplesGenerator(
+        file_name='data.csv',
+        output_file_name='small_multiples.gif',
+        figure_color='#ded6bd',
+        render_options=RenderOptions(delta_frames=True) # written by DeltaGifWriter, which redraws only the animated artists
+    )
@@ -0,0 +1,26 @@
+# This script reads data from manualy corrected .csv file (data.csv) from The World Bank and writes it
+# to a SQLite database (see common/sqlite_store.py), which can be shared by many worker processes.
+# More indicators can be added to the same database with --indicator-code and --indicator-name.
+# Usage: python build_store.py data.csv population.db
+#        python build_store.py data.csv population.db --year 2000 --nearest 38000000
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.sqlite_store import SqliteStore
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Writes population data to a SQLite database.')
+    parser.add_argument('file_name')
+    parser.add_argument('db_file')
+    parser.add_argument('--indicator-code', default='SP.POP.TOTL')
+    parser.add_argument('--indicator-name', default='Population, total')
+    parser.add_argument('--year', type=int, default=None, help='prints countries with population closest to --nearest')
+    parser.add_argument('--nearest', type=int, default=None)
+    arguments = parser.parse_args()
+
+    with SqliteStore(arguments.db_file) as store:
+        store.importCsv(arguments.file_name, arguments.indicator_code, arguments.indicator_name)
+        if arguments.year is not None and arguments.nearest is not None:
+            for name, population in store.nearestPopulation(arguments.year, arguments.nearest, indicator_code=arguments.indicator_code):
+                print(f'{name};{population}')
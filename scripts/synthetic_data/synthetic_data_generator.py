@@ -0,0 +1,135 @@
+# This script generates synthetic datasets for scale testing, in exactly the same layout as the
+# manualy corrected World Bank file read by readCsv (every cell quoted, every row ended with '",',
+# no new line at the end of the file), together with matching country_sizes.csv (name;size)
+# and calendar table (CATEGORY,NAME,START,END) used by the Gantt charts.
+# Entity count, year count, density of missing values and number of indicators are configurable,
+# the output only depends on the seed. Rows are generated and written in chunks, so even 1M entities
+# don't have to fit in memory at once.
+# Usage: python synthetic_data_generator.py output_dir --entities 100000 --years 61 --missing 0.05
+import argparse
+import datetime
+import os
+import string
+import numpy as np
+
+CALENDAR_CATEGORIES = ['Individual decisions', 'Courses resignations', 'Removing allocations',
+    'Performing allocations', 'Language exams', 'Examination sessions', 'Breaks', 'Classes', 'Semesters']
+INDICATORS = [('Population, total', 'SP.POP.TOTL')]
+
+
+class SyntheticDataGenerator:
+    def __init__(self, output_path, entities=216, years=61, first_year=1960, missing_density=0.0,
+            missing_mode='leading', indicators=1, calendar_rows=34, seed=0, chunk_size=10000):
+        # missing_density - expected fraction of empty cells
+        # missing_mode - 'leading': series start later (like in the real data), 'random': scattered gaps
+        self.output_path = output_path
+        self.entities = entities
+        self.years = [str(first_year + i) for i in range(years)]
+        self.missing_density = missing_density
+        self.missing_mode = missing_mode
+        self.indicators = INDICATORS + [(f'Synthetic indicator {i}', f'SYN.IND.{i}') for i in range(2, indicators+1)]
+        self.calendar_rows = calendar_rows
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    def countryName(self, index):
+        # Every 50th name mimics World Bank names like "Bahamas, The"
+        name = f'Synthetic Country {index:07d}'
+        return f'{name}, The' if index % 50 == 7 else name
+
+    def countryCode(self, index):
+        # 3 letter codes (AAA, AAB, ...), longer ones if there are more entities than 26^3
+        letters = []
+        length = 3
+        while 26**length <= index: index, length = index - 26**length, length + 1
+        for _ in range(length):
+            index, remainder = divmod(index, 26)
+            letters.append(string.ascii_uppercase[remainder])
+        return ''.join(reversed(letters))
+
+    def generateChunk(self, indicator_index, start, stop):
+        # Returns (values, mask) arrays of shape (stop-start, years); rng depends only on seed, indicator and chunk
+        rng = np.random.default_rng([self.seed, indicator_index, start])
+        count, years = stop - start, len(self.years)
+        base = np.exp(rng.uniform(np.log(1e3), np.log(1.4e9), count))
+        growth = rng.normal(0.015, 0.012, count)
+        noise = rng.normal(0, 0.004, (count, years))
+        values = np.rint(base[:, None] * np.exp(np.cumsum(growth[:, None] + noise, axis=1))).astype(np.int64)
+        if self.missing_mode == 'leading':
+            # first reported year is uniform in a range whose mean is missing_density*years
+            low, high = max(0.0, 2*self.missing_density-1)*years, min(2*self.missing_density, 1.0)*years
+            first_reported = np.floor(rng.uniform(low, high, count)).astype(np.int64)
+            mask = np.arange(years)[None, :] >= first_reported[:, None]
+        else:
+            mask = rng.random((count, years)) >= self.missing_density
+        return values, mask
+
+    def writePopulationFiles(self):
+        # One file per indicator: country_data.csv, country_data_2.csv, ...
+        file_names = []
+        header = ''.join(f'"{i}",' for i in ['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'] + self.years)
+        for indicator_index, (indicator_name, indicator_code) in enumerate(self.indicators):
+            suffix = '' if indicator_index == 0 else f'_{indicator_index+1}'
+            file_name = os.path.join(self.output_path, f'country_data{suffix}.csv')
+            with open(file_name, 'w') as file:
+                file.write(header)
+                for start in range(0, self.entities, self.chunk_size):
+                    stop = min(start + self.chunk_size, self.entities)
+                    values, mask = self.generateChunk(indicator_index, start, stop)
+                    cells = np.where(mask, values.astype(str), '')
+                    file.write(''.join(
+                        f'\n"{self.countryName(start+row)}","{self.countryCode(start+row)}","{indicator_name}",'
+                        f'"{indicator_code}",' + ''.join(f'"{i}",' for i in cells[row])
+                        for row in range(stop - start)))
+            file_names.append(file_name)
+        return file_names
+
+    def writeCountrySizes(self):
+        # Area in sq.km for every entity, one "name;size" line each, new line at the end (as in data/)
+        rng = np.random.default_rng([self.seed, 1000])
+        file_name = os.path.join(self.output_path, 'country_sizes.csv')
+        with open(file_name, 'w') as file:
+            for start in range(0, self.entities, self.chunk_size):
+                stop = min(start + self.chunk_size, self.entities)
+                sizes = np.rint(np.exp(rng.uniform(np.log(2), np.log(1.7e7), stop - start))).astype(np.int64)
+                file.write(''.join(f'{self.countryName(start+row)};{sizes[row]}\n' for row in range(stop - start)))
+        return file_name
+
+    def writeCalendarTable(self):
+        # Intervals of the Gantt categories within one academic year (1.10 - 30.09), dates as d.m.Y
+        rng = np.random.default_rng([self.seed, 1001])
+        year_start = datetime.date(2022, 10, 1)
+        file_name = os.path.join(self.output_path, 'calendar_year_table.csv')
+        with open(file_name, 'w') as file:
+            file.write('CATEGORY,NAME,START,END\n')
+            for row in range(self.calendar_rows):
+                category = CALENDAR_CATEGORIES[rng.integers(len(CALENDAR_CATEGORIES))]
+                start = year_start + datetime.timedelta(days=int(rng.integers(0, 350)))
+                end = min(start + datetime.timedelta(days=int(rng.integers(0, 60))), datetime.date(2023, 9, 30))
+                file.write(f'{category},{category} {row+1},{start.day}.{start.month}.{start.year},'
+                    f'{end.day}.{end.month}.{end.year}\n')
+        return file_name
+
+    def generate(self):
+        os.makedirs(self.output_path, exist_ok=True)
+        return self.writePopulationFiles() + [self.writeCountrySizes(), self.writeCalendarTable()]
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Generates synthetic World Bank-style population files.')
+    parser.add_argument('output_path')
+    parser.add_argument('--entities', type=int, default=216)
+    parser.add_argument('--years', type=int, default=61)
+    parser.add_argument('--first-year', type=int, default=1960)
+    parser.add_argument('--missing', type=float, default=0.0, help='fraction of empty cells (0-1)')
+    parser.add_argument('--missing-mode', choices=['leading', 'random'], default='leading')
+    parser.add_argument('--indicators', type=int, default=1)
+    parser.add_argument('--calendar-rows', type=int, default=34)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    for file_name in SyntheticDataGenerator(arguments.output_path, entities=arguments.entities,
+            years=arguments.years, first_year=arguments.first_year, missing_density=arguments.missing,
+            missing_mode=arguments.missing_mode, indicators=arguments.indicators,
+            calendar_rows=arguments.calendar_rows, seed=arguments.seed).generate():
+        print(file_name)
@@ -0,0 +1,30 @@
+# Instruments end every stage even when one of them raises (like MemoryError of a memory limit).
+import os
+import sys
+import pytest
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.animation_output import RenderInstrument, RenderOptions, renderStage
+
+
+class RecordingInstrument(RenderInstrument):
+    def __init__(self, error=None):
+        self.error = error
+        self.ended = []
+
+    def endStage(self, stage, frame):
+        self.ended.append((stage, frame))
+        if self.error: raise self.error
+
+
+def testAllInstrumentsEndStage():
+    first, limited, last = RecordingInstrument(), RecordingInstrument(MemoryError('limit')), RecordingInstrument()
+    with pytest.raises(MemoryError, match='limit'):
+        with renderStage(RenderOptions(instruments=[first, limited, last]), 'draw', 3): pass
+    assert first.ended == limited.ended == last.ended == [('draw', 3)]
+
+
+def testStageErrorIsKept():
+    instrument = RecordingInstrument()
+    with pytest.raises(ValueError, match='frame'):
+        with renderStage(RenderOptions(instruments=[instrument]), 'draw', 0): raise ValueError('frame')
+    assert instrument.ended == [('draw', 0)]
@@ -0,0 +1,18 @@
+# A file without any known population size is reported instead of failing inside the rank arrays.
+import os
+import sys
+import numpy as np
+import pytest
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(SCRIPTS_DIR)
+sys.path.append(os.path.join(SCRIPTS_DIR, 'bar_chart_race'))
+from bar_chart_race import BarChartRaceGenerator
+from common.population_dataset import PopulationDataset
+
+
+@pytest.mark.parametrize('years', [[2000, 2001], []])
+def testNothingToRank(tmp_path, years):
+    PopulationDataset.fromArrays(['Poland', 'Chile'], ['POL', 'CHL'], years, np.zeros((2, len(years))),
+        np.zeros((2, len(years)), dtype=bool)).writeCsv(str(tmp_path/'data.csv'))
+    with pytest.raises(ValueError, match='nothing to rank'):
+        BarChartRaceGenerator(str(tmp_path/'data.csv'), str(tmp_path/'race.gif'))
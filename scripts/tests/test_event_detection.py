@@ -0,0 +1,23 @@
+# Overtakes found from rank changes are all pairs whose order changes between consecutive years.
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.event_detection import rankOvertakes, rankVectors
+from common.population_dataset import PopulationDataset
+
+
+def testOvertakesOfAllPairs():
+    random = np.random.default_rng(0)
+    values = np.cumprod(1 + random.normal(0.01, 0.02, (40, 30)), axis=1)*random.integers(10**5, 10**6, (40, 1))
+    mask = random.random(values.shape) > 0.1
+    names = [f'Country {i}' for i in range(40)]
+    dataset = PopulationDataset.fromArrays(names, names, range(1960, 1990), np.where(mask, values, 0), mask)
+    ranks = rankVectors(dataset)
+    expected = {(int(dataset.years.values[column]), names[a], names[b]) for column in range(1, 30)
+        for a in range(40) for b in range(40)
+        if ranks[a, column - 1] > ranks[b, column - 1] and ranks[a, column] < ranks[b, column]}
+    found = {(i['year'], i['country'], i['other']) for i in rankOvertakes(dataset)}
+    assert found == expected
+    found = {(i['year'], i['country'], i['other']) for i in rankOvertakes(dataset, max_rank=10)}
+    assert found == {i for i in expected if ranks[names.index(i[1]), i[0] - 1960] < 10}
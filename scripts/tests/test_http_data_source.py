@@ -0,0 +1,101 @@
+# The data of data/country_data.csv served by a local http.server with the pages of The World Bank API
+# gives the same dataset, a refresh is answered with 304 Not Modified, a timed out connection is closed.
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(SCRIPTS_DIR)
+from common.http_data_source import HttpDataSource
+from common.population_dataset import PopulationDataset
+
+DATA_FILE = os.path.join(SCRIPTS_DIR, '..', 'data', 'country_data.csv')
+
+
+def apiRecords(dataset):
+    # records of the country list and of the indicator, with the World aggregate added like in the API
+    countries = [{'id': str(code), 'region': {'id': 'ECS'}} for code in dataset.codes]
+    countries.append({'id': 'WLD', 'region': {'id': 'NA'}})
+    indicator = []
+    for name, code, values, mask in zip(dataset.names.tolist(), dataset.codes.tolist(), dataset.values, dataset.mask):
+        for year, value, known in reversed(list(zip(dataset.years, values.tolist(), mask.tolist()))):
+            indicator.append({'countryiso3code': code, 'country': {'id': code[:2], 'value': name}, 'date': str(year),
+                'value': value if known else None})
+    indicator += [{'countryiso3code': 'WLD', 'country': {'id': '1W', 'value': 'World'}, 'date': str(year),
+        'value': 8*10**9} for year in dataset.years]
+    return {'/v2/country': countries, '/v2/country/all/indicator/SP.POP.TOTL': indicator}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # connections are kept alive like by the API
+    records = None
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/v2/slow': time.sleep(1)
+        query = urllib.parse.parse_qs(url.query)
+        records = self.records.get(url.path, [])
+        per_page, page = int(query['per_page'][0]), int(query['page'][0])
+        pages = max((len(records) + per_page - 1)//per_page, 1)
+        body = json.dumps([{'page': page, 'pages': pages, 'per_page': per_page, 'total': len(records)},
+            records[(page - 1)*per_page:page*per_page]]).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args): pass
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return PopulationDataset(DATA_FILE)
+
+
+@pytest.fixture(scope='module')
+def server(dataset):
+    ApiHandler.records = apiRecords(dataset)
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), ApiHandler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{http_server.server_address[1]}/v2'
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def testLoadAndRefresh(server, dataset, tmp_path):
+    with HttpDataSource(server, cache_dir=str(tmp_path), per_page=2000) as source:
+        loaded = source.loadDataset()
+        requests = source.stats['requests']
+    assert loaded.names.tolist() == dataset.names.tolist() and loaded.codes.tolist() == dataset.codes.tolist()
+    assert loaded.years.values.tolist() == dataset.years.values.tolist()
+    assert np.array_equal(loaded.mask, dataset.mask)
+    assert np.array_equal(loaded.values[loaded.mask], dataset.values[dataset.mask])
+    with HttpDataSource(server, cache_dir=str(tmp_path), per_page=2000) as source:
+        refreshed = source.loadDataset()
+        assert source.stats['not_modified'] == source.stats['requests'] == requests
+    assert np.array_equal(refreshed.values, loaded.values)
+
+
+def testTimedOutConnectionIsClosed(server, tmp_path):
+    with HttpDataSource(server, cache_dir=str(tmp_path), timeout=0.2) as source:
+        source.get(source.path('country', 1))
+        connection = source.pool.queue[-1] # kept alive after the first answer
+        with pytest.raises(TimeoutError):
+            source.get(source.path('slow', 1))
+        assert source.pool.empty() and connection.sock is None
+        assert json.loads(source.get(source.path('country', 1)))[0]['page'] == 1 # on a new connection
@@ -0,0 +1,93 @@
+# Appending countries or years to a cached dataset with indexes gives the same data and indexes
+# as parsing the whole file again, a rejected append changes nothing. Table keys matching several
+# countries are not joined silently.
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import dataset_cache
+from common.population_dataset import PopulationDataset
+
+INDEXES = ('ranks', 'known_counts', 'first_known', 'last_known')
+
+
+def makeDataset(rows, columns, seed=0):
+    random = np.random.default_rng(seed)
+    values = random.integers(1000, 100000, (rows, columns))
+    mask = random.random((rows, columns)) > 0.2
+    mask[0] = False # a country without known values
+    names = [f'Country {i}' for i in range(rows)]
+    codes = [f'C{i:02d}' for i in range(rows)]
+    return PopulationDataset.fromArrays(names, codes, range(1960, 1960 + columns), np.where(mask, values, 0), mask)
+
+
+def part(dataset, rows, columns):
+    return PopulationDataset.fromArrays(dataset.names[rows], dataset.codes[rows], dataset.years.values[columns],
+        dataset.values[rows, columns], dataset.mask[rows, columns])
+
+
+def assertAppendMatchesRebuild(tmp_path, stored, appended):
+    full = makeDataset(12, 8)
+    part(full, *stored).writeCsv(str(tmp_path/'data.csv'))
+    part(full, *appended).writeCsv(str(tmp_path/'added.csv'))
+    full.buildIndexes()
+    dataset_cache.loadDataset(str(tmp_path/'data.csv')) # writes the cache with indexes
+    dataset = dataset_cache.appendCsv(str(tmp_path/'data.csv'), str(tmp_path/'added.csv'))
+    for result in (dataset, dataset_cache.loadCache(str(tmp_path/'data.csv'))):
+        assert result.names.tolist() == full.names.tolist()
+        assert np.array_equal(result.values, full.values) and np.array_equal(result.mask, full.mask)
+        for name in INDEXES: assert np.array_equal(getattr(result, name), getattr(full, name)), name
+
+
+def testAppendOnlyNewCountries(tmp_path):
+    assertAppendMatchesRebuild(tmp_path, (slice(0, 9), slice(0, 8)), (slice(9, 12), slice(0, 8)))
+
+
+def testAppendOnlyNewYears(tmp_path):
+    assertAppendMatchesRebuild(tmp_path, (slice(0, 12), slice(0, 6)), (slice(0, 12), slice(6, 8)))
+
+
+def makeAmbiguousDataset(tmp_path):
+    # "St. Lucia" and "Saint Lucia" normalize to the same name
+    dataset = PopulationDataset.fromArrays(['Saint Lucia', 'Poland', 'St. Lucia'], ['LCA', 'POL', 'XSL'], [2000],
+        [[180000], [38000000], [1000]], [[True], [True], [True]])
+    (tmp_path/'sizes.csv').write_text('St Lucia;616\nPOL;312696\nXSL;10')
+    return dataset
+
+
+def testJoinRejectsAmbiguousNames(tmp_path):
+    dataset = makeAmbiguousDataset(tmp_path)
+    with pytest.raises(ValueError, match='match several countries'):
+        dataset.joinTable(str(tmp_path/'sizes.csv'))
+
+
+def testJoinWarnsAboutAmbiguousNames(tmp_path):
+    dataset = makeAmbiguousDataset(tmp_path)
+    with pytest.warns(UserWarning, match="'St Lucia': \\['Saint Lucia', 'St. Lucia'\\]"):
+        sizes = dataset.joinTable(str(tmp_path/'sizes.csv'), strict=False)
+    assert np.isnan(sizes[0]) and sizes[1] == 312696 and sizes[2] == 10 # codes still match their rows
+
+
+def testRejectedAppendKeepsDataset():
+    dataset = part(makeDataset(12, 8), slice(0, 9), slice(0, 6))
+    dataset.buildIndexes()
+    before = {name: getattr(dataset, name).copy() for name in ('names', 'values', 'mask') + INDEXES}
+    changed = dataset.values[1:3, 4:6] + 1 # stored values differ, the years 1966-1967 are new
+    with pytest.raises(ValueError, match='stored values differ'):
+        dataset.appendData(dataset.names[1:3], dataset.codes[1:3], range(1964, 1968),
+            np.concatenate([changed, changed], axis=1), np.ones((2, 4), dtype=bool))
+    assert dataset.years.values.tolist() == list(range(1960, 1966))
+    for name, value in before.items(): assert np.array_equal(getattr(dataset, name), value), name
+
+
+def testAppendUpdatesDensity(tmp_path):
+    full, dataset = makeDataset(12, 8), part(makeDataset(12, 8), slice(0, 9), slice(0, 6))
+    for rows, name in ((12, 'full.csv'), (9, 'stored.csv')):
+        (tmp_path/name).write_text('\n'.join(f'Country {i};{i + 1}' for i in range(rows)))
+    full.readCountrySizeCSV(str(tmp_path/'full.csv'))
+    dataset.readCountrySizeCSV(str(tmp_path/'stored.csv'))
+    dataset.appendData(full.names, full.codes, full.years.values, full.values, full.mask)
+    expected = np.where(full.mask, full.values/full.sizes[:, None], np.nan).T
+    assert np.array_equal(dataset.density[:, :9], expected[:, :9], equal_nan=True)
+    assert np.isnan(dataset.density[:, 9:]).all() # sizes of the added countries are not known yet
@@ -0,0 +1,97 @@
+# Charts are rendered once and then answered from the caches. Wrong requests are answered with 400
+# and a readable message, failed renders with 500.
+import json
+import os
+import shutil
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import pytest
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(SCRIPTS_DIR)
+sys.path.append(os.path.join(SCRIPTS_DIR, 'render_service'))
+from http.server import ThreadingHTTPServer
+from render_service import RenderRequestHandler, RenderService
+
+DATA_FILE = os.path.join(SCRIPTS_DIR, '..', 'data', 'country_data.csv')
+
+
+class FailingService(RenderService):
+    # fails to render requests with "fail", like a render breaking on a bug
+    def render(self, parameters):
+        if parameters.get('fail'): raise RuntimeError('render failed')
+        return super().render(parameters)
+
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    file_name = str(tmp_path_factory.mktemp('data')/'data.csv')
+    shutil.copy(DATA_FILE, file_name)
+    return FailingService(file_name)
+
+
+@pytest.fixture(scope='module')
+def server(service):
+    RenderRequestHandler.service = service
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RenderRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def request(server, parameters, method='POST'):
+    # (status, content type, body) of the answer, parameters as a JSON body or in the query
+    if method == 'POST': url, data = server + '/render', json.dumps(parameters).encode()
+    else: url, data = server + '/render?' + urllib.parse.urlencode(parameters), None
+    try:
+        with urllib.request.urlopen(url, data, timeout=60) as answer:
+            return answer.status, answer.headers['Content-Type'], answer.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers['Content-Type'], error.read()
+
+
+def testRenderAndCaches(server, service):
+    chart = {'type': 'bar', 'countries': 'China,India', 'years': '2015-2020'}
+    renders, frame_hits = service.renders, service.frame_data.hits
+    status, content_type, gif = request(server, dict(chart, format='gif'))
+    assert status == 200 and content_type == 'image/gif' and gif.startswith(b'GIF8')
+    assert service.renders == renders + 1
+    # the same request again comes from the result cache
+    result_hits = service.results.hits
+    assert request(server, dict(chart, format='gif'))[2] == gif
+    assert service.results.hits == result_hits + 1 and service.renders == renders + 1
+    # png of the same countries and years is rendered again from the cached frame data
+    status, content_type, png = request(server, dict(chart, format='png'), method='GET')
+    assert status == 200 and content_type == 'image/png' and png.startswith(b'\x89PNG')
+    assert service.renders == renders + 2 and service.frame_data.hits == frame_hits + 1
+
+
+@pytest.mark.parametrize('years, message', [('2030-2040', 'the data has years'), ('2000-1990', 'first year is after'),
+    ('1990', 'use first-last')])
+def testWrongYears(service, years, message):
+    with pytest.raises(ValueError, match=message):
+        service.parseRequest({'countries': 'China', 'years': years})
+
+
+@pytest.mark.parametrize('selection, message', [('top:5:1800', '1800 is not in the year axis'),
+    ('top:5', 'use top'), ('top:x:2000', 'Wrong selection'), ('closest:Atlantis:3', 'Unknown country: Atlantis')])
+def testWrongSelection(service, selection, message):
+    with pytest.raises(ValueError, match=message):
+        service.parseRequest({'selection': selection})
+
+
+def testErrorAnswers(server):
+    status, _, body = request(server, {'countries': 'China', 'years': '2030-2040'})
+    assert status == 400 and b'the data has years' in body
+    status, _, body = request(server, {'selection': 'top:5:1800'})
+    assert status == 400 and b'1800 is not in the year axis' in body
+    status, _, body = request(server, {'countries': 'China', 'fail': True})
+    assert status == 500 and b'RuntimeError: render failed' in body
+
+
+def testNonAsciiErrorMessage(server):
+    # the message is not latin-1, it must not break the status line
+    status, _, body = request(server, {'type': 'line', 'countries': '日本'}, method='GET')
+    assert status == 400 and 'Unknown countries' in body.decode() and '日本' in body.decode()
@@ -0,0 +1,43 @@
+# Workers read the dataset from shared memory, attaching it doesn't take it over from its owner.
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(SCRIPTS_DIR)
+from common.population_dataset import PopulationDataset
+from common.shared_dataset import SharedDataset, attachDataset
+
+
+def knownTotal(dataset, row):
+    return int(dataset.values[row][dataset.mask[row]].sum())
+
+
+def makeDataset():
+    values = np.arange(12).reshape(4, 3)*1000
+    return PopulationDataset.fromArrays([f'Country {i}' for i in range(4)], [f'C{i}' for i in range(4)],
+        [2000, 2001, 2002], values, values % 2000 == 0)
+
+
+def testMapAndAttach():
+    dataset = makeDataset()
+    values = dataset.values
+    assert dataset.shared_memory is None
+    with SharedDataset(dataset) as shared:
+        assert shared.map(knownTotal, range(4), processes=2) == [knownTotal(dataset, i) for i in range(4)]
+        attached = attachDataset(shared.description)
+        assert np.array_equal(attached.values, values) and len(attached.shared_memory) == 5
+        for block in attached.shared_memory: block.close()
+
+
+def testAttachFromOtherProgram():
+    # the resource tracker of a process which only attached the memory must not remove it at exit
+    with SharedDataset(makeDataset()) as shared:
+        subprocess.run([sys.executable, '-c', 'import sys; sys.path.append(sys.argv[1]); '
+            'from common.shared_dataset import attachDataset; attachDataset(eval(sys.argv[2]))',
+            SCRIPTS_DIR, repr(shared.description)], check=True)
+        for _ in range(20): # the tracker of the finished program removes its memory shortly after it
+            shared_memory.SharedMemory(name=shared.description['values']['memory']).close()
+            time.sleep(0.05)
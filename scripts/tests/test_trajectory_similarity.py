@@ -0,0 +1,43 @@
+# Correlation distances of series with gaps equal 1 - Pearson correlation over the common years,
+# euclidean distances of nearly equal large series don't lose their difference.
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.population_dataset import PopulationDataset
+from common.trajectory_similarity import allClosestTrajectories, closestTrajectories, distanceBlock, prepareSeries
+
+
+def testCorrelationOverCommonYears():
+    random = np.random.default_rng(0)
+    values = np.cumsum(random.integers(-5000, 20000, (30, 40)), axis=1) + 10**6
+    mask = random.random(values.shape) > 0.3
+    mask[0, :20] = False # a series known only in the second half
+    series, weights = prepareSeries(values, mask, 'correlation')
+    distances = distanceBlock(series, weights, np.arange(len(values)), 'correlation')
+    for i in range(len(values)):
+        for j in range(len(values)):
+            common = mask[i] & mask[j]
+            expected = 1 - np.corrcoef(values[i, common], values[j, common])[0, 1]
+            assert np.isclose(distances[i, j], expected, atol=1e-9), (i, j)
+
+
+def testEuclideanOfNearlyEqualLargeSeries():
+    years = np.arange(40)
+    values = np.array([10**9 + 10**6*years, 10**9 + 10**6*years + 3, 1000 + years]) # RMS difference 3
+    mask = np.ones(values.shape, dtype=bool)
+    series, weights = prepareSeries(values, mask, 'euclidean')
+    distances = distanceBlock(series, weights, np.arange(3), 'euclidean')
+    assert np.isclose(distances[0, 1], 3, rtol=1e-9) and np.isclose(distances[1, 0], 3, rtol=1e-9)
+    assert distances[0, 0] == 0
+
+
+def testRejectsWrongK():
+    dataset = PopulationDataset.fromArrays(['A', 'B', 'C'], ['AAA', 'BBB', 'CCC'], [2000, 2001],
+        [[1, 2], [2, 3], [5, 7]], np.ones((3, 2), dtype=bool))
+    assert closestTrajectories(dataset, 'A', 1, 'euclidean')[0][0] == 'B'
+    with pytest.raises(ValueError, match='k must be at least 1'):
+        closestTrajectories(dataset, 'A', 0)
+    with pytest.raises(ValueError, match='k must be at least 1'):
+        allClosestTrajectories(dataset, -1)
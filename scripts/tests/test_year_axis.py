@@ -0,0 +1,26 @@
+# Columns of years and year slices, also on axes with gaps and on an empty axis
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.year_axis import YearAxis
+
+
+def testContiguousAxis():
+    years = YearAxis([str(i) for i in range(1960, 1970)])
+    assert years.index('1965') == 5 and years[1963] == 3
+    assert years[1962:1966].tolist() == [2, 3, 4, 5] and years[1950:1962].tolist() == [0, 1]
+    with pytest.raises(ValueError): years.index(1970)
+
+
+def testAxisWithGaps():
+    years = YearAxis([1960, 1970, 1980, 1990])
+    assert years.indexes([1990, 1970]).tolist() == [3, 1] and years[1965:1985].tolist() == [1, 2]
+
+
+def testEmptyAxis():
+    years = YearAxis([])
+    assert len(years[:]) == 0 and len(years[1960:1970]) == 0
+    years.append([2000, 2001])
+    assert years[2001] == 1 and years[:].tolist() == [0, 1]
@@ -0,0 +1,34 @@
+# This script reads data from manualy corrected .csv file (data.csv) from The World Bank and finds
+# countries whose whole population trajectories (1960-current year) are the most similar.
+# With --target it prints k closest countries of one country (they can be used as chosen_countries
+# of the generators), without it k closest countries of every country are written to a .csv file,
+# which is used to build comparison animations in batch.
+# Usage: python closest_trajectories.py data.csv --target Poland --k 4 --metric log
+#        python closest_trajectories.py data.csv --k 4 --output closest.csv
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.population_dataset import PopulationDataset
+from common.trajectory_similarity import METRICS, allClosestTrajectories, closestTrajectories
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description='Finds countries with the most similar population trajectories.')
+    parser.add_argument('file_name')
+    parser.add_argument('--target', default=None, help='country name, all countries if not given')
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--metric', choices=METRICS, default='log')
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--output', default='closest_trajectories.csv')
+    arguments = parser.parse_args()
+
+    dataset = PopulationDataset(arguments.file_name)
+    if arguments.target:
+        for name, distance in closestTrajectories(dataset, arguments.target, arguments.k, arguments.metric):
+            print(f'{name};{distance:.6g}')
+    else:
+        indexes, distances = allClosestTrajectories(dataset, arguments.k, arguments.metric, arguments.block_size)
+        with open(arguments.output, 'w') as file:
+            for row, name in enumerate(dataset.names):
+                file.write(';'.join([name] + [f'{dataset.names[i]};{distance:.6g}'
+                    for i, distance in zip(indexes[row], distances[row])]) + '\n')